@@ -1,15 +1,25 @@
 from flask import Flask
 from flask_restful import Api
+from flask_migrate import Migrate, upgrade, stamp
 from dotenv import load_dotenv
 import os
 
+# Antes dos imports do projeto: vários módulos leem as variáveis do .env ao serem importados
+load_dotenv()
+
 from models import db
+from conexoes import opcoes_engine, configurar_sqlite, REPLICA
+from metricas import instalar as instalar_metricas
 from resources import *
-
-load_dotenv()
+from jobs import instalar as instalar_jobs, RequisicaoUpload, TAMANHO_MAXIMO
+from versionamento import inicializar_versoes
 
 app = Flask(__name__)
 
+# Uploads: limite de tamanho (413 antes de ler o corpo) e arquivos pequenos mantidos em memória
+app.config['MAX_CONTENT_LENGTH'] = TAMANHO_MAXIMO
+app.request_class = RequisicaoUpload
+
 
 # --- INÍCIO DA NOVA CONFIGURAÇÃO ---
 import os
@@ -29,31 +39,90 @@ else:
     HOST = os.getenv('DB_HOST')
     BANCO = os.getenv('DB_NOME')
     app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+pymysql://{USUARIO}:{SENHA}@{HOST}/{BANCO}'
+
+# Pool de conexões (tamanho, overflow, reciclagem, pre-ping e timeouts) definido no .env
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Réplica de leitura opcional: os GETs passam a ser atendidos por ela
+REPLICA_URI = os.getenv('DB_REPLICA_URI')
+if REPLICA_URI:
+    print("--- Réplica de leitura configurada para os GETs ---")
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA: {'url': REPLICA_URI, **opcoes_engine(REPLICA_URI)}}
     
 # --- FIM DA NOVA CONFIGURAÇÃO ---
 
 db.init_app(app) 
 
+# WAL e PRAGMAs nas conexões SQLite (leituras não esperam os uploads terminarem)
+with app.app_context():
+    for engine in db.engines.values():
+        if engine.dialect.name == 'sqlite':
+            configurar_sqlite(engine)
+
+# Esquema do banco versionado pelo Alembic (pasta migrations/).
+# render_as_batch permite alterar colunas/índices no SQLite, que não suporta ALTER TABLE completo.
+migrate = Migrate(app, db, render_as_batch=True)
+REVISAO_INICIAL = '60207775ac5e'
+
+
+def atualizar_esquema():
+    """
+    Cria/atualiza o esquema pelas migrações (chamar dentro de um app_context).
+    Bancos criados antes das migrações (via db.create_all) são marcados antes: na revisão
+    inicial, que tem só as 5 tabelas de tags, ou na última, se já têm todas as tabelas dos models.
+    """
+    tabelas = set(db.inspect(db.engine).get_table_names())
+    if 'especialidade' in tabelas and 'alembic_version' not in tabelas:
+        stamp(revision='head' if tabelas >= set(db.metadata.tables) else REVISAO_INICIAL)
+    upgrade()
+
+
 # Inicialização da Apiz
 api = Api(app)
 
+# Latência, consultas SQL e serialização por requisição (expostas em /metrics)
+instalar_metricas(app)
+
+# Jobs de upload interrompidos: retomados na 1ª requisição de cada processo ou por `flask retomar-jobs`
+instalar_jobs(app)
+
 # Rotas
 api.add_resource(Especialidades, '/api/especialidades') 
+api.add_resource(EspecialidadesBatch, '/api/especialidades/batch')
+api.add_resource(EspecialidadesExport, '/api/especialidades/export')
 api.add_resource(Especialidade, '/api/especialidades/<int:id>')
 
 api.add_resource(Responsaveis, '/api/responsaveis') 
+api.add_resource(ResponsaveisBatch, '/api/responsaveis/batch')
+api.add_resource(ResponsaveisExport, '/api/responsaveis/export')
 api.add_resource(Responsavel, '/api/responsaveis/<int:id>')
 
 api.add_resource(Medicos, '/api/medicos') 
+api.add_resource(MedicosBatch, '/api/medicos/batch')
+api.add_resource(MedicosExport, '/api/medicos/export')
 api.add_resource(Medico, '/api/medicos/<int:id>')
 
 api.add_resource(Cirurgias, '/api/cirurgias') 
+api.add_resource(CirurgiasBatch, '/api/cirurgias/batch')
+api.add_resource(CirurgiasExport, '/api/cirurgias/export')
 api.add_resource(Cirurgia, '/api/cirurgias/<int:id>')
 
 api.add_resource(Planos, '/api/planos') 
+api.add_resource(PlanosBatch, '/api/planos/batch')
+api.add_resource(PlanosExport, '/api/planos/export')
 api.add_resource(Plano, '/api/planos/<int:id>')
 
 api.add_resource(UploadDados, '/api/upload')
+api.add_resource(UploadStatus, '/api/upload/<string:job_id>')
+api.add_resource(ExportarPlanilha, '/api/export')
+
+api.add_resource(Lookup, '/api/lookup')
+api.add_resource(Estatisticas, '/api/stats')
+api.add_resource(EstatisticasEspecialidades, '/api/stats/especialidades')
+
+api.add_resource(CacheStatus, '/api/cache')
+api.add_resource(PoolStatus, '/api/pool')
+api.add_resource(Metricas, '/metrics')
 
 # Rota da home
 @app.route('/')
@@ -65,10 +134,11 @@ def home():
 if __name__ == '__main__':
     with app.app_context():
         from models import EspecialidadeModel, MedicoModel, CirurgiaModel, ResponsavelModel, PlanoModel
-        # db.create_all() garante que as tabelas sejam criadas se não existirem.
-        # Para um ambiente de produção, é recomendado usar uma ferramenta de migração
-        # como o Flask-Migrate para gerenciar mudanças no esquema do banco de dados.
-        db.create_all()
+        # O esquema (inclusive os índices de busca) é criado/atualizado pelas migrações (migrations/versions)
+        atualizar_esquema()
+        
+        # Versões das tabelas (usadas na invalidação do cache de respostas)
+        inicializar_versoes(EspecialidadeModel, MedicoModel, CirurgiaModel, ResponsavelModel, PlanoModel)
         print("Banco de dados conectado e tabelas verificadas.")
     
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Teste de carga dos endpoints de listagem, detalhe e busca pelo test client do Flask, sobre um
+SQLite populado com uma planilha sintética. O cache de respostas fica desligado (a não ser
+com --com-cache), para que cada requisição chegue ao banco.
+
+Uso: python benchmarks/bench_api.py [--linhas 10k] [--requisicoes 500] [--recursos medicos,planos]
+"""
+import io
+import os
+import time
+import random
+import tempfile
+import argparse
+import statistics
+from contextlib import redirect_stdout
+
+from comum import RAIZ, ROTAS, criar_app
+from gerar_planilha import SOBRENOMES, AREAS, converter_tamanho, obter
+
+from models import db
+from cache import cache_respostas
+from resources import DefaultsResource
+from processador_planilha import ProcessadorExcel
+
+DIRETORIO_DADOS = os.path.join(RAIZ, 'benchmarks', 'dados')
+AQUECIMENTO = 20
+
+
+def cenarios(recurso, total, aleatorio):
+    """
+    Cada cenário é uma função que devolve a próxima URL a requisitar.
+    """
+    paginas = max(total // 10, 1)
+    termos = SOBRENOMES + AREAS
+    return {
+        'lista': lambda: f'/api/{recurso}?page={aleatorio.randint(1, paginas)}',
+        'lista_sem_count': lambda: f'/api/{recurso}?page={aleatorio.randint(1, paginas)}&count=false',
+        'lista_ativos': lambda: f'/api/{recurso}?ativo=true&page={aleatorio.randint(1, paginas)}',
+        'cursor': lambda: f'/api/{recurso}?limit=10&cursor={DefaultsResource.codificar_cursor(aleatorio.randint(1, total))}',
+        'detalhe': lambda: f'/api/{recurso}/{aleatorio.randint(1, total)}',
+        'busca': lambda: f'/api/{recurso}?search={aleatorio.choice(termos)}'
+    }
+
+
+def percentil(tempos, p):
+    ordenados = sorted(tempos)
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+def carga(cliente, proxima_url, requisicoes):
+    for _ in range(AQUECIMENTO):
+        cliente.get(proxima_url())
+
+    tempos = []
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        url = proxima_url()
+        t0 = time.perf_counter()
+        resposta = cliente.get(url)
+        tempos.append(time.perf_counter() - t0)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"GET {url} retornou {resposta.status_code}: {resposta.get_data(as_text=True)}")
+    total = time.perf_counter() - inicio
+
+    return {
+        'requisicoes': requisicoes,
+        'media_ms': round(statistics.mean(tempos) * 1000, 3),
+        'p50_ms': round(percentil(tempos, 0.50) * 1000, 3),
+        'p95_ms': round(percentil(tempos, 0.95) * 1000, 3),
+        'p99_ms': round(percentil(tempos, 0.99) * 1000, 3),
+        'req_por_segundo': round(requisicoes / total, 1)
+    }
+
+
+def executar(linhas='10k', requisicoes=500, recursos=('medicos',), com_cache=False, semente=42):
+    """
+    Retorna {recurso: {cenario: métricas}}.
+    """
+    planilha = obter(DIRETORIO_DADOS, converter_tamanho(linhas))
+    habilitado = cache_respostas.habilitado
+    cache_respostas.habilitado = com_cache
+    resultados = {}
+
+    try:
+        with tempfile.TemporaryDirectory() as diretorio:
+            app = criar_app('sqlite:///' + os.path.join(diretorio, 'bench.db'))
+            with app.app_context():
+                print(f"Populando o banco com {linhas} linhas...")
+                with redirect_stdout(io.StringIO()):
+                    ProcessadorExcel().executar(planilha)
+
+                cliente = app.test_client()
+                for recurso in recursos:
+                    model = ROTAS[recurso][0].model
+                    total = db.session.query(model).count()
+                    aleatorio = random.Random(semente)
+
+                    resultados[recurso] = {}
+                    for nome, proxima_url in cenarios(recurso, total, aleatorio).items():
+                        metricas = carga(cliente, proxima_url, requisicoes)
+                        resultados[recurso][nome] = metricas
+                        print(f"   {recurso}/{nome}: p50 {metricas['p50_ms']} ms, p95 {metricas['p95_ms']} ms, "
+                              f"{metricas['req_por_segundo']} req/s")
+
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        cache_respostas.habilitado = habilitado
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga nos endpoints de listagem, detalhe e busca')
+    parser.add_argument('--linhas', default='10k')
+    parser.add_argument('--requisicoes', type=int, default=500)
+    parser.add_argument('--recursos', default='medicos')
+    parser.add_argument('--com-cache', action='store_true')
+    args = parser.parse_args()
+
+    executar(args.linhas, args.requisicoes, args.recursos.split(','), args.com_cache)
+
+
+if __name__ == '__main__':
+    main()
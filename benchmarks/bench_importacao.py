@@ -0,0 +1,114 @@
+"""
+Benchmark da importação: ProcessadorExcel.executar sobre planilhas sintéticas, em linhas/s e
+pico de memória (RSS). Cada tamanho roda em um processo separado, para que o pico medido
+seja só o daquela importação, gravando num SQLite novo em um diretório temporário.
+
+Uso: python benchmarks/bench_importacao.py [tamanhos] [--modo inserir|upsert] [--paralelo]
+     tamanhos: lista separada por vírgula (padrão 1k,100k; 1m disponível)
+"""
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import subprocess
+from contextlib import redirect_stdout
+
+from comum import RAIZ
+from gerar_planilha import converter_tamanho, obter
+
+DIRETORIO_DADOS = os.path.join(RAIZ, 'benchmarks', 'dados')
+
+
+def pico_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem getrusage
+        return None
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def medir(planilha, modo='inserir', paralelo=False):
+    """
+    Importa a planilha num banco vazio e retorna as métricas (roda no processo filho).
+    """
+    from comum import criar_app
+    from processador_planilha import ProcessadorExcel
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        app = criar_app('sqlite:///' + os.path.join(diretorio, 'bench.db'))
+        with app.app_context():
+            rss_inicial = pico_rss_mb()
+
+            # Em upsert, a 1ª importação popula o banco e só a 2ª é medida
+            if modo == 'upsert':
+                with redirect_stdout(io.StringIO()):
+                    ProcessadorExcel().executar(planilha)
+
+            inicio = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                resultado = ProcessadorExcel(modo=modo, paralelo=paralelo).executar(planilha)
+            segundos = time.perf_counter() - inicio
+
+    linhas = sum(
+        r['inseridos'] + r.get('atualizados', 0) + r.get('inalterados', 0) + len(r['falhas'])
+        for r in resultado.values()
+    )
+    return {
+        'linhas': linhas,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': round(linhas / segundos, 1) if segundos else None,
+        'rss_inicial_mb': rss_inicial,
+        'pico_rss_mb': pico_rss_mb(),
+        'falhas': sum(len(r['falhas']) for r in resultado.values())
+    }
+
+
+def executar(tamanhos, modo='inserir', paralelo=False):
+    """
+    Mede cada tamanho em um subprocesso. Retorna {tamanho: métricas}.
+    """
+    resultados = {}
+    for tamanho in tamanhos:
+        planilha = obter(DIRETORIO_DADOS, converter_tamanho(tamanho))
+
+        comando = [sys.executable, os.path.abspath(__file__), '--filho', planilha, '--modo', modo]
+        if paralelo:
+            comando.append('--paralelo')
+
+        print(f"Importando {tamanho} ({modo}{', paralelo' if paralelo else ''})...")
+        processo = subprocess.run(comando, capture_output=True, text=True)
+        if processo.returncode != 0:
+            raise RuntimeError(f"Falha no benchmark de {tamanho}:\n{processo.stderr}")
+
+        # A última linha da saída do filho é o JSON com as métricas
+        resultados[tamanho] = json.loads(processo.stdout.strip().splitlines()[-1])
+        metricas = resultados[tamanho]
+        print(f"   {metricas['linhas']} linhas em {metricas['segundos']}s: "
+              f"{metricas['linhas_por_segundo']} linhas/s, pico de {metricas['pico_rss_mb']} MB")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da importação de planilhas')
+    parser.add_argument('tamanhos', nargs='?', default='1k,100k')
+    parser.add_argument('--modo', choices=('inserir', 'upsert'), default='inserir')
+    parser.add_argument('--paralelo', action='store_true')
+    parser.add_argument('--filho', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(medir(args.filho, args.modo, args.paralelo)))
+        return
+
+    print(json.dumps(executar(args.tamanhos.split(','), args.modo, args.paralelo), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark de inicialização: tempo de import e memória (RSS) de um worker da API, medidos em
+processos novos. Também verifica que o caminho CRUD (import do app + GETs, POST, exportação
+csv/ndjson) não carrega pandas, numpy nem openpyxl, que só devem ser importados no
+primeiro upload. Termina com código 1 se algum deles for carregado.
+
+Uso: python benchmarks/bench_inicializacao.py [repeticoes]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que não podem aparecer num worker que só atende a API
+PROIBIDOS = ('pandas', 'numpy', 'openpyxl', 'processador_planilha')
+
+
+def _rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem getrusage
+        return None
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _carregados():
+    return [m for m in PROIBIDOS if m in sys.modules]
+
+
+def medir():
+    """
+    Executado no processo filho (nenhum import do projeto antes da medição).
+    """
+    sys.path.insert(0, RAIZ)
+    os.chdir(RAIZ)
+
+    inicio = time.perf_counter()
+    importlib.import_module('app')
+    import_app = time.perf_counter() - inicio
+    rss_app = _rss_mb()
+    apos_import = _carregados()
+
+    # Caminho CRUD completo, num banco em memória
+    sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+    from comum import ROTAS, criar_app
+    crud = criar_app('sqlite://')
+    cliente = crud.test_client()
+    for nome in ROTAS:
+        resposta = cliente.post(f'/api/{nome}', json={'nome': f'{nome} 1', 'tipo': 'Cirurgião', 'id_especialidade': 1})
+        if resposta.status_code != 201:
+            raise RuntimeError(f"POST /api/{nome} retornou {resposta.status_code}: {resposta.get_data(as_text=True)}")
+        for url in (f'/api/{nome}', f'/api/{nome}/1', f'/api/{nome}?search=1',
+                    f'/api/{nome}/export?format=csv', f'/api/{nome}/export?format=ndjson'):
+            resposta = cliente.get(url)
+            # Consome e fecha as respostas em streaming das exportações
+            resposta.get_data()
+            resposta.close()
+            if resposta.status_code != 200:
+                raise RuntimeError(f"GET {url} retornou {resposta.status_code}")
+    apos_crud = _carregados()
+
+    # Para comparação: o que o pipeline da planilha acrescenta quando é carregado
+    inicio = time.perf_counter()
+    importlib.import_module('processador_planilha')
+    import_processador = time.perf_counter() - inicio
+
+    return {
+        'import_app_segundos': round(import_app, 4),
+        'rss_app_mb': rss_app,
+        'import_processador_segundos': round(import_processador, 4),
+        'rss_com_processador_mb': _rss_mb(),
+        'carregados_no_import': apos_import,
+        'carregados_no_crud': apos_crud
+    }
+
+
+def executar(repeticoes=5):
+    """
+    Mede em <repeticoes> processos novos e devolve as medianas.
+    """
+    amostras = []
+    for _ in range(repeticoes):
+        processo = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho'], capture_output=True, text=True, cwd=RAIZ
+        )
+        if processo.returncode != 0:
+            raise RuntimeError(f"Falha no benchmark de inicialização:\n{processo.stderr}")
+        amostras.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+
+    resultado = {
+        chave: statistics.median(a[chave] for a in amostras)
+        for chave in ('import_app_segundos', 'rss_app_mb', 'import_processador_segundos', 'rss_com_processador_mb')
+        if all(a[chave] is not None for a in amostras)
+    }
+    resultado['modulos_proibidos'] = sorted({m for a in amostras for m in a['carregados_no_import'] + a['carregados_no_crud']})
+
+    print(f"Import do app: {resultado['import_app_segundos'] * 1000:.0f} ms, RSS {resultado.get('rss_app_mb')} MB "
+          f"(pipeline da planilha: +{resultado['import_processador_segundos'] * 1000:.0f} ms, "
+          f"RSS {resultado.get('rss_com_processador_mb')} MB)")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de import e memória de um worker da API')
+    parser.add_argument('repeticoes', nargs='?', type=int, default=5)
+    parser.add_argument('--filho', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(medir()))
+        return
+
+    resultado = executar(args.repeticoes)
+    print(json.dumps(resultado, indent=2))
+
+    if resultado['modulos_proibidos']:
+        print(f"Carregados no caminho CRUD: {', '.join(resultado['modulos_proibidos'])}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
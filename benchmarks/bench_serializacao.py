@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: marshal() do flask_restful sobre objetos ORM x serializador compilado sobre tuplas.
+
+Uso: python benchmarks/bench_serializacao.py [linhas] [repeticoes]
+"""
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_restful import marshal
+
+from models import db, EspecialidadeModel, MedicoModel
+from resources import Medicos, consulta_com_relacionamentos
+from serializacao import serializador
+
+
+def criar_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    return app
+
+
+def popular(linhas):
+    db.create_all()
+    especialidades = [{'nome': f'especialidade {i}'} for i in range(50)]
+    db.session.execute(EspecialidadeModel.__table__.insert(), especialidades)
+    medicos = [
+        {'nome': f'medico {i}', 'tipo': 'pj', 'id_especialidade': (i % 51) or None, 'pacientes': i % 7 or None}
+        for i in range(linhas)
+    ]
+    db.session.execute(MedicoModel.__table__.insert(), medicos)
+    db.session.commit()
+
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    app = criar_app()
+    with app.app_context():
+        popular(linhas)
+
+        # Caminho antigo: objetos ORM (com joinedload) + marshal
+        def atual():
+            itens = consulta_com_relacionamentos(MedicoModel, Medicos.relacionamentos).order_by(MedicoModel.id).all()
+            return json.dumps(marshal(itens, Medicos.default_fields))
+
+        # Caminho novo: tuplas + serializador compilado
+        compilado = serializador(MedicoModel, Medicos.default_fields)
+
+        def novo():
+            itens = compilado.consulta().order_by(MedicoModel.id).all()
+            return json.dumps(compilado.linhas(itens))
+
+        tempo_atual, saida_atual = medir(atual, repeticoes)
+        tempo_novo, saida_nova = medir(novo, repeticoes)
+
+        print(f"{linhas} linhas, melhor de {repeticoes}:")
+        print(f"  marshal (ORM):          {tempo_atual * 1000:8.1f} ms")
+        print(f"  serializador compilado: {tempo_novo * 1000:8.1f} ms  ({tempo_atual / tempo_novo:.1f}x)")
+        print(f"  JSON idêntico: {saida_atual == saida_nova}")
+
+        if saida_atual != saida_nova:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
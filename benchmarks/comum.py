@@ -0,0 +1,109 @@
+"""
+Funções compartilhadas pelos scripts de benchmarks/: app Flask com as rotas das tags sobre um
+banco criado pelas migrações, e leitura/gravação dos resultados em JSON.
+"""
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from flask import Flask
+from flask_restful import Api
+from flask_migrate import Migrate, upgrade
+
+from models import db
+from conexoes import configurar_sqlite
+from resources import (
+    Especialidades, Especialidade, Medicos, Medico, Cirurgias, Cirurgia,
+    Responsaveis, Responsavel, Planos, Plano,
+    EspecialidadesExport, MedicosExport, CirurgiasExport, ResponsaveisExport, PlanosExport,
+    EspecialidadesBatch, MedicosBatch, CirurgiasBatch, ResponsaveisBatch, PlanosBatch
+)
+
+TEMPLATE = os.path.join(RAIZ, 'template-upload-tags.xlsx')
+
+ROTAS = {
+    'especialidades': (Especialidades, Especialidade),
+    'medicos': (Medicos, Medico),
+    'cirurgias': (Cirurgias, Cirurgia),
+    'responsaveis': (Responsaveis, Responsavel),
+    'planos': (Planos, Plano)
+}
+
+EXPORTACOES = {
+    'especialidades': EspecialidadesExport,
+    'medicos': MedicosExport,
+    'cirurgias': CirurgiasExport,
+    'responsaveis': ResponsaveisExport,
+    'planos': PlanosExport
+}
+
+LOTES = {
+    'especialidades': EspecialidadesBatch,
+    'medicos': MedicosBatch,
+    'cirurgias': CirurgiasBatch,
+    'responsaveis': ResponsaveisBatch,
+    'planos': PlanosBatch
+}
+
+
+def criar_app(uri='sqlite://'):
+    """
+    App com as rotas de listagem/lote/detalhe/exportação das tags e o esquema aplicado pelas migrações.
+    Arquivos SQLite recebem os mesmos PRAGMAs do app.py.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    db.init_app(app)
+    Migrate(app, db, directory=os.path.join(RAIZ, 'migrations'), render_as_batch=True)
+
+    api = Api(app)
+    for nome, (lista, detalhe) in ROTAS.items():
+        api.add_resource(lista, f'/api/{nome}')
+        api.add_resource(LOTES[nome], f'/api/{nome}/batch')
+        api.add_resource(EXPORTACOES[nome], f'/api/{nome}/export')
+        api.add_resource(detalhe, f'/api/{nome}/<int:id>')
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite' and uri != 'sqlite://':
+            configurar_sqlite(db.engine)
+        upgrade()
+    return app
+
+
+def ambiente():
+    """
+    Identifica a máquina e a versão do código em que os números foram medidos.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def salvar_json(caminho, dados):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+        arquivo.write('\n')
+
+
+def ler_json(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
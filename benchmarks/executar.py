@@ -0,0 +1,126 @@
+"""
+Roda a suíte de benchmarks (importação, API e inicialização), grava os resultados em JSON e compara com a
+baseline guardada, terminando com código 1 se alguma métrica piorar além da tolerância.
+
+Uso: python benchmarks/executar.py [--tamanhos 1k,100k] [--salvar-baseline] [--tolerancia 0.2]
+
+Os números dependem da máquina: gere a baseline (--salvar-baseline) no mesmo ambiente em que
+as comparações serão feitas.
+"""
+import os
+import sys
+import argparse
+from datetime import datetime
+
+from comum import RAIZ, ambiente, salvar_json, ler_json
+import bench_importacao
+import bench_api
+import bench_inicializacao
+
+BASELINE = os.path.join(RAIZ, 'benchmarks', 'baseline.json')
+DIRETORIO_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+# Sentido de cada métrica comparada: 1 = maior é melhor, -1 = menor é melhor
+METRICAS = {
+    'linhas_por_segundo': 1,
+    'req_por_segundo': 1,
+    'pico_rss_mb': -1,
+    'p50_ms': -1,
+    'p95_ms': -1,
+    'import_app_segundos': -1,
+    'rss_app_mb': -1
+}
+
+
+def _folhas(resultados, caminho=()):
+    """
+    Percorre o JSON de resultados devolvendo (caminho, métrica, valor) das métricas comparáveis.
+    """
+    for chave, valor in resultados.items():
+        if isinstance(valor, dict):
+            yield from _folhas(valor, caminho + (chave,))
+        elif chave in METRICAS and isinstance(valor, (int, float)):
+            yield '/'.join(caminho), chave, valor
+
+
+def comparar(atual, baseline, tolerancia):
+    """
+    Retorna a lista de regressões: métricas que pioraram mais que a tolerância (fração).
+    Métricas ausentes na baseline (ex.: tamanho novo) são ignoradas.
+    """
+    referencia = {(caminho, metrica): valor for caminho, metrica, valor in _folhas(baseline)}
+    regressoes = []
+
+    for caminho, metrica, valor in _folhas(atual):
+        anterior = referencia.get((caminho, metrica))
+        if not anterior:
+            continue
+
+        # Variação no sentido "pior" (positiva quando piorou)
+        variacao = (anterior - valor) / anterior * METRICAS[metrica]
+        if variacao > tolerancia:
+            regressoes.append({
+                'caminho': caminho,
+                'metrica': metrica,
+                'baseline': anterior,
+                'atual': valor,
+                'piora': round(variacao, 4)
+            })
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suíte de benchmarks do tags-api')
+    parser.add_argument('--tamanhos', default='1k,100k', help='planilhas da importação (ex.: 1k,100k,1m)')
+    parser.add_argument('--linhas-api', default='10k', help='linhas no banco do teste de carga')
+    parser.add_argument('--requisicoes', type=int, default=500)
+    parser.add_argument('--recursos', default='medicos')
+    parser.add_argument('--saida', help='arquivo de resultados (padrão: benchmarks/resultados/<data>.json)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--salvar-baseline', action='store_true')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    args = parser.parse_args()
+
+    resultados = {
+        'ambiente': ambiente(),
+        'metricas': {
+            'importacao': bench_importacao.executar(args.tamanhos.split(',')),
+            'api': bench_api.executar(args.linhas_api, args.requisicoes, args.recursos.split(',')),
+            'inicializacao': bench_inicializacao.executar()
+        }
+    }
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    salvar_json(saida, resultados)
+    print(f"\nResultados gravados em {saida}")
+
+    if args.salvar_baseline:
+        salvar_json(args.baseline, resultados)
+        print(f"Baseline atualizada em {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("Sem baseline para comparar (rode com --salvar-baseline para criar uma).")
+        return
+
+    baseline = ler_json(args.baseline)
+    regressoes = comparar(resultados['metricas'], baseline['metricas'], args.tolerancia)
+    resultados['comparacao'] = {
+        'baseline': baseline['ambiente'],
+        'tolerancia': args.tolerancia,
+        'regressoes': regressoes
+    }
+    salvar_json(saida, resultados)
+
+    if not regressoes:
+        print(f"Nenhuma regressão acima de {args.tolerancia:.0%} em relação à baseline ({baseline['ambiente']['commit']}).")
+        return
+
+    print(f"{len(regressoes)} regressões acima de {args.tolerancia:.0%}:")
+    for r in regressoes:
+        print(f"   {r['caminho']} {r['metrica']}: {r['baseline']} -> {r['atual']} ({r['piora']:.0%} pior)")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Gera planilhas sintéticas no layout do template-upload-tags.xlsx (título na 1ª linha,
+cabeçalho na 2ª), com o total de linhas pedido distribuído entre as abas.
+
+Uso: python benchmarks/gerar_planilha.py <linhas> [arquivo.xlsx]
+     linhas aceita sufixos: 1k, 100k, 1m
+"""
+import os
+import sys
+
+import openpyxl
+
+# Palavras usadas nos nomes (e nos termos de busca dos benchmarks da API)
+SOBRENOMES = ('silva', 'souza', 'oliveira', 'santos', 'lima', 'costa', 'pereira', 'almeida', 'ferreira', 'rocha')
+AREAS = ('cardio', 'dermato', 'neuro', 'ortopedia', 'pediatria', 'oftalmo', 'gastro', 'urologia')
+TIPOS = ('Cooperado', 'pj', 'Credenciado')
+
+# Mesma ordem e cabeçalhos do template
+ABAS = {
+    'Médicos': ['Nome', 'Especialidade', 'Tipo'],
+    'Responsáveis': ['Nome', 'Email', 'Telefone'],
+    'Planos': ['Nome', 'Sigla'],
+    'Especialidades': ['Nome', 'Descrição'],
+    'Cirurgias': ['Nome', 'Especialidade Relacionada']
+}
+
+
+def converter_tamanho(texto):
+    """
+    '1k' -> 1000, '1m' -> 1000000, '2500' -> 2500
+    """
+    texto = str(texto).strip().lower()
+    multiplicador = {'k': 1000, 'm': 1000000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip('km')) * multiplicador)
+
+
+def distribuir(total):
+    """
+    Divide o total entre as abas: poucas especialidades (referenciadas pelas demais) e o
+    grosso em Médicos, como nas planilhas reais.
+    """
+    especialidades = max(10, total // 50)
+    resto = max(total - especialidades, 0)
+    medicos = resto * 40 // 100
+    cirurgias = resto * 20 // 100
+    responsaveis = resto * 25 // 100
+    planos = resto - medicos - cirurgias - responsaveis
+    return {
+        'Médicos': medicos,
+        'Responsáveis': responsaveis,
+        'Planos': planos,
+        'Especialidades': especialidades,
+        'Cirurgias': cirurgias
+    }
+
+
+def _especialidade(i):
+    return f'{AREAS[i % len(AREAS)]} {i}'
+
+
+def _linhas(aba, quantidade, especialidades):
+    for i in range(quantidade):
+        sobrenome = SOBRENOMES[i % len(SOBRENOMES)]
+        # Parte das referências vem em caixa alta, como nas planilhas preenchidas à mão
+        referencia = _especialidade(i % especialidades)
+        if i % 3 == 0:
+            referencia = referencia.upper()
+
+        if aba == 'Médicos':
+            yield [f'Medico {sobrenome} {i}', referencia, TIPOS[i % len(TIPOS)]]
+        elif aba == 'Responsáveis':
+            yield [f'Responsavel {sobrenome} {i}', f'responsavel{i}@exemplo.com.br', 21900000000 + i]
+        elif aba == 'Planos':
+            yield [f'Plano {sobrenome} {i}', f'P{i % 100000}']
+        elif aba == 'Especialidades':
+            yield [_especialidade(i), f'Descrição da especialidade {i}']
+        else:
+            yield [f'Cirurgia {AREAS[i % len(AREAS)]} {sobrenome} {i}', referencia]
+
+
+def gerar(caminho, total):
+    """
+    Grava a planilha em modo write_only (sem montar a planilha inteira na memória).
+    Retorna a quantidade de linhas por aba.
+    """
+    quantidades = distribuir(total)
+    workbook = openpyxl.Workbook(write_only=True)
+
+    for aba, cabecalhos in ABAS.items():
+        planilha = workbook.create_sheet(aba)
+        planilha.append([aba])
+        planilha.append(cabecalhos)
+        for linha in _linhas(aba, quantidades[aba], quantidades['Especialidades']):
+            planilha.append(linha)
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    workbook.save(caminho)
+    return quantidades
+
+
+def obter(diretorio, total):
+    """
+    Retorna o caminho da planilha de <total> linhas em <diretorio>, gerando-a só se ainda não existir.
+    """
+    caminho = os.path.join(diretorio, f'planilha_{total}.xlsx')
+    if not os.path.exists(caminho):
+        print(f"Gerando planilha sintética com {total} linhas em {caminho}...")
+        gerar(caminho, total)
+    return caminho
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    total = converter_tamanho(sys.argv[1])
+    destino = sys.argv[2] if len(sys.argv) > 2 else f'planilha_{total}.xlsx'
+    print(gerar(destino, total))
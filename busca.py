@@ -0,0 +1,148 @@
+import os
+import re
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import match
+
+from models import db
+
+# --- Camada de busca ---
+# Implementa o parâmetro ?search= dos resources de listagem. Cada backend usa um índice
+# sobre as colunas de texto da tabela para filtrar/ordenar uma query por relevância.
+# Os índices são criados pelas migrações (migrations/versions/*_indices_de_busca.py), nunca
+# durante uma requisição. O backend é escolhido pelo dialeto do banco (ou pela variável
+# BUSCA_BACKEND do .env: 'auto' ou 'like').
+
+# Colunas indexadas, quando existirem no modelo (as mesmas da migração dos índices de busca)
+CAMPOS_BUSCA = ('nome', 'email', 'sigla')
+
+
+def _colunas(model):
+    return [model.__table__.c[c] for c in CAMPOS_BUSCA if c in model.__table__.c]
+
+
+def _termos(prompt):
+    # Quebra o texto em palavras (letras/dígitos), descartando operadores e pontuação
+    return [t for t in re.split(r'\W+', prompt.lower()) if t]
+
+
+# Backend padrão: LIKE '%x%' (varredura completa, sem índice)
+class BuscaLike:
+    nome = 'like'
+
+    def filtrar(self, model, query, prompt, ordenar=True):
+        return query.filter(model.nome.like(f'%{prompt}%'))
+
+
+class BuscaIndexada:
+    """
+    Base dos backends com índice: verifica (só com leituras) se o índice da tabela existe,
+    com a consulta e o nome de índice de cada backend. Sem o índice a busca usa LIKE. Só a
+    existência fica guardada: um índice ausente volta a ser procurado na busca seguinte.
+    """
+    consulta_indice = None
+    nome_indice = None
+
+    def __init__(self):
+        self._existentes = set()
+
+    def indexada(self, model):
+        tabela = model.__tablename__
+        if tabela not in self._existentes:
+            parametros = {'tabela': tabela, 'indice': self.nome_indice.format(tabela=tabela)}
+            with db.engine.connect() as conexao:
+                if conexao.execute(sa.text(self.consulta_indice), parametros).first() is None:
+                    return False
+            self._existentes.add(tabela)
+        return True
+
+
+# SQLite: tabela virtual FTS5 por tabela, sincronizada por triggers
+class BuscaFTS5(BuscaIndexada):
+    nome = 'fts5'
+    consulta_indice = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :indice"
+    nome_indice = '{tabela}_fts'
+
+    def filtrar(self, model, query, prompt, ordenar=True):
+        termos = _termos(prompt)
+        if not termos:
+            # Busca sem nenhuma palavra (ex.: só pontuação) não casa com nada
+            return query.filter(sa.false())
+
+        if not self.indexada(model):
+            return BuscaLike().filtrar(model, query, prompt, ordenar)
+
+        # Cada palavra vira um prefixo ("card"*) e todas precisam casar
+        fts = f'{model.__tablename__}_fts'
+        expressao = ' '.join(f'"{t}"*' for t in termos)
+        resultados = (
+            sa.select(sa.literal_column('rowid').label('id'), sa.literal_column(f'bm25({fts})').label('rank'))
+            .select_from(sa.table(fts))
+            .where(sa.text(f'{fts} MATCH :busca').bindparams(busca=expressao))
+            .subquery()
+        )
+
+        query = query.join(resultados, model.id == resultados.c.id)
+        if ordenar:
+            # bm25 é menor quanto mais relevante
+            query = query.order_by(resultados.c.rank, model.id)
+        return query
+
+
+# MySQL: índice FULLTEXT (busca booleana com prefixo; acentos são ignorados pela collation *_ci)
+class BuscaFullText(BuscaIndexada):
+    nome = 'fulltext'
+    consulta_indice = (
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = :tabela AND index_name = :indice"
+    )
+    nome_indice = 'ft_{tabela}'
+
+    # Palavras menores que innodb_ft_min_token_size (padrão 3) não entram no índice
+    TAMANHO_MINIMO = 3
+
+    def filtrar(self, model, query, prompt, ordenar=True):
+        termos = _termos(prompt)
+        if not termos:
+            # Busca sem nenhuma palavra (ex.: só pontuação) não casa com nada
+            return query.filter(sa.false())
+
+        # Termos curtos demais para o índice: busca por prefixo no nome (ainda usa índice B-tree)
+        if all(len(t) < self.TAMANHO_MINIMO for t in termos):
+            return query.filter(model.nome.like(f'{prompt.strip()}%'))
+
+        if not self.indexada(model):
+            return BuscaLike().filtrar(model, query, prompt, ordenar)
+
+        expressao = ' '.join(f'+{t}*' for t in termos if len(t) >= self.TAMANHO_MINIMO)
+        relevancia = match(*_colunas(model), against=expressao).in_boolean_mode()
+
+        query = query.filter(relevancia)
+        if ordenar:
+            query = query.order_by(relevancia.desc(), model.id)
+        return query
+
+
+_backends = {}
+
+
+def obter_backend():
+    """
+    Retorna o backend de busca adequado ao banco em uso (um por dialeto, criado sob demanda).
+    """
+    escolha = os.getenv('BUSCA_BACKEND', 'auto')
+    dialeto = db.engine.dialect.name
+
+    if escolha == 'like' or dialeto not in ('sqlite', 'mysql'):
+        chave = 'like'
+    else:
+        chave = dialeto
+
+    if chave not in _backends:
+        _backends[chave] = {'like': BuscaLike, 'sqlite': BuscaFTS5, 'mysql': BuscaFullText}[chave]()
+    return _backends[chave]
+
+
+def buscar(model, query, prompt, ordenar=True):
+    return obter_backend().filtrar(model, query, prompt, ordenar)
+
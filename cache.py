@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# --- Cache de respostas ---
+# Guarda as respostas (já serializadas em dict) dos GETs dos resources de tags.
+# As chaves incluem a versão das tabelas envolvidas (ver versionamento.py), então uma
+# escrita invalida exatamente as respostas que dependem da tabela alterada.
+#
+# Dois níveis:
+# - local: LRU com TTL na memória do processo;
+# - compartilhado (opcional, CACHE_BACKEND=compartilhado): Redis em CACHE_REDIS_URL, ou,
+#   se o pacote redis não estiver instalado, um substituto local com a mesma interface.
+
+
+class CacheLRU:
+
+    def __init__(self, max_itens=1024, ttl=60):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+
+            valor, expira_em, _ = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, tabelas=()):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + self.ttl, frozenset(tabelas))
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover_tabelas(self, tabelas):
+        # Descarta as entradas que dependem de alguma das tabelas
+        tabelas = set(tabelas)
+        with self._lock:
+            for chave in [c for c, (_, _, t) in self._itens.items() if t & tabelas]:
+                del self._itens[chave]
+
+    def __len__(self):
+        return len(self._itens)
+
+
+# Substituto local do backend compartilhado (mesma interface do BackendRedis)
+class BackendCompartilhadoLocal:
+    nome = 'local'
+
+    def __init__(self):
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[1] < time.monotonic():
+                return None
+            return item[0]
+
+    def set(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl)
+
+
+class BackendRedis:
+    nome = 'redis'
+
+    def __init__(self, url):
+        import redis
+        self._cliente = redis.Redis.from_url(url)
+
+    def get(self, chave):
+        return self._cliente.get(chave)
+
+    def set(self, chave, valor, ttl):
+        self._cliente.set(chave, valor, ex=ttl)
+
+
+def _criar_backend_compartilhado():
+    if os.getenv('CACHE_BACKEND', 'memoria') != 'compartilhado':
+        return None
+
+    url = os.getenv('CACHE_REDIS_URL')
+    if url:
+        try:
+            return BackendRedis(url)
+        except ImportError:
+            print("Pacote redis não instalado: usando o cache compartilhado local.")
+    return BackendCompartilhadoLocal()
+
+
+class CacheRespostas:
+
+    def __init__(self):
+        self.ttl = int(os.getenv('CACHE_TTL', 60))
+        self.local = CacheLRU(int(os.getenv('CACHE_MAX_ITENS', 1024)), self.ttl)
+        self.compartilhado = _criar_backend_compartilhado()
+        self.habilitado = os.getenv('CACHE_HABILITADO', '1') != '0'
+        self.contadores = {'acertos': 0, 'acertos_compartilhado': 0, 'falhas': 0, 'invalidacoes': 0}
+
+    def obter(self, chave, tabelas=()):
+        if not self.habilitado:
+            return None
+
+        valor = self.local.get(chave)
+        if valor is None and self.compartilhado is not None:
+            bruto = self.compartilhado.get(chave)
+            if bruto is not None:
+                valor = json.loads(bruto)
+                self.local.set(chave, valor, tabelas)
+                self.contadores['acertos_compartilhado'] += 1
+
+        self.contadores['acertos' if valor is not None else 'falhas'] += 1
+        return valor
+
+    def guardar(self, chave, valor, tabelas=()):
+        if not self.habilitado:
+            return
+
+        self.local.set(chave, valor, tabelas)
+        if self.compartilhado is not None:
+            self.compartilhado.set(chave, json.dumps(valor), self.ttl)
+
+    def invalidar(self, tabelas):
+        # No compartilhado as entradas antigas ficam inalcançáveis (a versão mudou) e expiram pelo TTL
+        self.local.remover_tabelas(tabelas)
+        self.contadores['invalidacoes'] += 1
+
+    def estatisticas(self):
+        consultas = self.contadores['acertos'] + self.contadores['falhas']
+        return {
+            **self.contadores,
+            'taxa_acerto': round(self.contadores['acertos'] / consultas, 4) if consultas else None,
+            'itens_locais': len(self.local),
+            'backend_compartilhado': self.compartilhado.nome if self.compartilhado is not None else None,
+            'habilitado': self.habilitado
+        }
+
+
+def chave_resposta(recurso, argumentos, versoes):
+    """
+    Monta a chave de cache de uma resposta: resource, argumentos do request e versões das tabelas.
+    """
+    args = '&'.join(f'{k}={v}' for k, v in sorted(argumentos.items()))
+    vers = ','.join(f'{t}:{v}' for t, (v, _) in sorted(versoes.items()))
+    return f'{recurso}?{args}#{vers}'
+
+
+cache_respostas = CacheRespostas()
@@ -0,0 +1,121 @@
+import os
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# --- Conexões com o banco ---
+# Opções do pool de conexões lidas do .env, roteamento dos GETs para uma réplica de
+# leitura (opcional, DB_REPLICA_URI) e ajustes do SQLite para leituras concorrentes.
+
+# Bind da réplica em SQLALCHEMY_BINDS
+REPLICA = 'replica'
+
+# Padrões do MySQL: pool maior que o do SQLAlchemy (uploads seguram conexões por mais tempo)
+# e reciclagem antes do wait_timeout do servidor, para não reutilizar conexões já fechadas
+PADROES_MYSQL = {
+    'DB_POOL_SIZE': '10',
+    'DB_MAX_OVERFLOW': '20',
+    'DB_POOL_RECYCLE': '280',
+    'DB_POOL_TIMEOUT': '30',
+    'DB_POOL_PRE_PING': '1',
+    'DB_CONNECT_TIMEOUT': '10'
+}
+
+
+def _env(nome, padroes):
+    return os.getenv(nome) or padroes.get(nome)
+
+
+def opcoes_engine(uri):
+    """
+    Monta o SQLALCHEMY_ENGINE_OPTIONS para a URI. No MySQL valem os PADROES_MYSQL para o que
+    não estiver no .env; no SQLite só o que estiver definido explicitamente.
+    """
+    padroes = PADROES_MYSQL if uri.startswith('mysql') else {}
+    opcoes = {}
+
+    for variavel, opcao in (('DB_POOL_SIZE', 'pool_size'), ('DB_MAX_OVERFLOW', 'max_overflow'),
+                            ('DB_POOL_RECYCLE', 'pool_recycle'), ('DB_POOL_TIMEOUT', 'pool_timeout')):
+        valor = _env(variavel, padroes)
+        if valor:
+            opcoes[opcao] = int(valor)
+
+    pre_ping = _env('DB_POOL_PRE_PING', padroes)
+    if pre_ping:
+        opcoes['pool_pre_ping'] = pre_ping.lower() in ('1', 'true', 'sim')
+
+    # Timeouts do driver (PyMySQL), em segundos
+    if uri.startswith('mysql'):
+        connect_args = {}
+        for variavel, argumento in (('DB_CONNECT_TIMEOUT', 'connect_timeout'), ('DB_READ_TIMEOUT', 'read_timeout'),
+                                    ('DB_WRITE_TIMEOUT', 'write_timeout')):
+            valor = _env(variavel, padroes)
+            if valor:
+                connect_args[argumento] = int(valor)
+        if connect_args:
+            opcoes['connect_args'] = connect_args
+
+    return opcoes
+
+
+def configurar_sqlite(engine):
+    """
+    Aplica os PRAGMAs em cada conexão nova do SQLite. Com WAL os leitores não são bloqueados
+    pela escrita de um upload, e o busy_timeout faz as escritas concorrentes esperarem a vez
+    em vez de falharem com "database is locked".
+    """
+    journal_mode = os.getenv('DB_SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous = os.getenv('DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+    busy_timeout = int(os.getenv('DB_SQLITE_BUSY_TIMEOUT', 5000))
+    cache_kb = int(os.getenv('DB_SQLITE_CACHE_KB', 20000))
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        # NORMAL é seguro com WAL (só o último commit pode se perder numa queda de energia)
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        # cache_size negativo é em KiB
+        cursor.execute(f'PRAGMA cache_size=-{cache_kb}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+
+def _leitura():
+    return has_request_context() and request.method in ('GET', 'HEAD')
+
+
+class SessaoRoteada(Session):
+    """
+    Session do Flask-SQLAlchemy que envia as consultas dos GETs para a réplica, quando
+    configurada. Escritas, jobs em segundo plano e scripts continuam no banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and REPLICA in self._db.engines and _leitura():
+            return self._db.engines[REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def estatisticas_pool(engines):
+    """
+    Estado do pool de cada engine (principal e réplica).
+    """
+    resultado = {}
+    for chave, engine in engines.items():
+        pool = engine.pool
+        estado = {'dialeto': engine.dialect.name, 'pool': type(pool).__name__}
+
+        # StaticPool/NullPool (SQLite em memória) não têm esses contadores
+        for contador in ('size', 'checkedin', 'checkedout', 'overflow'):
+            if hasattr(pool, contador):
+                estado[contador] = getattr(pool, contador)()
+        if hasattr(pool, '_timeout'):
+            estado['timeout'] = pool._timeout
+        estado['recycle'] = pool._recycle
+        estado['pre_ping'] = pool._pre_ping
+
+        resultado[chave or 'principal'] = estado
+    return resultado
@@ -0,0 +1,97 @@
+import io
+import csv
+import json
+import tempfile
+
+from serializacao import serializador
+
+# --- Exportação em massa ---
+# Gera o conteúdo das tabelas de tags em streaming: as linhas vêm do banco em lotes
+# (yield_per, cursor do lado do servidor no MySQL) e são escritas aos poucos na resposta,
+# sem COUNT e sem carregar a tabela inteira na memória.
+
+TAMANHO_LOTE = 1000
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# Cabeçalho da planilha -> chave do *_fields (o resto é só o cabeçalho em minúsculo)
+COLUNAS_PLANILHA = {
+    'Descrição': 'descricao',
+    'Especialidade Relacionada': 'especialidade'
+}
+
+
+def linhas(model, campos):
+    """
+    Gera as linhas da tabela já serializadas (mesmo formato da API), lendo em lotes.
+    """
+    compilado = serializador(model, campos)
+    consulta = compilado.consulta().order_by(model.id).yield_per(TAMANHO_LOTE)
+    for row in consulta:
+        yield compilado.linha(row)
+
+
+def _em_lotes(itens):
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) == TAMANHO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def gerar_ndjson(model, campos):
+    for lote in _em_lotes(linhas(model, campos)):
+        yield ''.join(json.dumps(linha, ensure_ascii=False) + '\n' for linha in lote)
+
+
+def gerar_csv(model, campos):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    escritor.writerow(list(campos.keys()))
+    for lote in _em_lotes(linhas(model, campos)):
+        escritor.writerows([list(linha.values()) for linha in lote])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Tabela vazia: ainda assim envia o cabeçalho
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def gerar_xlsx(abas):
+    """
+    Gera uma planilha no layout do template de upload (título na 1ª linha, cabeçalho na 2ª),
+    para que o arquivo possa ser reenviado ao /api/upload como está.
+    abas: lista de (nome da aba, cabeçalhos do template, model, fields).
+    """
+    # Importado sob demanda: só a exportação em xlsx precisa do openpyxl
+    import openpyxl
+
+    # write_only grava as linhas direto em arquivos temporários, sem manter a planilha na memória
+    workbook = openpyxl.Workbook(write_only=True)
+    for nome, cabecalhos, model, campos in abas:
+        planilha = workbook.create_sheet(nome)
+        planilha.append([nome])
+        planilha.append(cabecalhos)
+
+        chaves = [COLUNAS_PLANILHA.get(c, c.lower()) for c in cabecalhos]
+        for linha in linhas(model, campos):
+            planilha.append([linha.get(chave) for chave in chaves])
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as arquivo:
+        workbook.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(64 * 1024)
+            if not bloco:
+                break
+            yield bloco
@@ -0,0 +1,27 @@
+from sqlalchemy import select, update
+
+from models import db, ImpressaoLinhaModel
+
+# --- Impressões das linhas importadas ---
+# O modo incremental da importação guarda o hash de cada linha da planilha (por nome) e pula
+# as linhas com o mesmo hash da importação anterior. Toda escrita fora dele (CRUD, lotes,
+# upsert) invalida as impressões das linhas que alterou, para que voltem a ser comparadas
+# com o banco na importação seguinte. A impressão invalidada continua existindo: a linha
+# segue contando como importada para o desativar_ausentes.
+
+# Hash que não coincide com nenhuma linha da planilha
+INVALIDA = ''
+
+
+def invalidar_impressoes(tabela, filtro):
+    """
+    Invalida as impressões das linhas da tabela que atendem ao filtro (um único UPDATE, na
+    transação atual).
+    """
+    impressao = ImpressaoLinhaModel.__table__
+    nomes = select(tabela.c.nome).where(filtro)
+    db.session.execute(
+        update(impressao)
+        .where(impressao.c.tabela == tabela.name, impressao.c.nome.in_(nomes))
+        .values(hash=INVALIDA)
+    )
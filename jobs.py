@@ -0,0 +1,235 @@
+import io
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import Request
+
+from models import db, UploadJobModel
+
+# Pool local que executa os jobs de upload fora da thread da requisição
+executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPLOAD_WORKERS', 2)), thread_name_prefix='upload')
+
+# Jobs 'processando' sem atualização há mais tempo que isso são considerados órfãos (processo reiniciado)
+TEMPO_ORFAO = timedelta(minutes=int(os.getenv('UPLOAD_JOB_TIMEOUT_MIN', 10)))
+
+# Máximo de linhas com falha guardadas (por aba) no resultado do job
+MAX_FALHAS = 100
+
+MB = 1024 * 1024
+
+# Tamanho máximo de um upload (vira o MAX_CONTENT_LENGTH do app)
+TAMANHO_MAXIMO = int(os.getenv('UPLOAD_MAX_MB', 50)) * MB
+
+# Uploads até este tamanho também ficam na memória do processo que os recebeu, de onde o job
+# os lê sem reabrir o arquivo
+LIMITE_MEMORIA = int(os.getenv('UPLOAD_MEMORIA_MAX_MB', 8)) * MB
+
+# Diretório dos arquivos dos uploads (persistem até o fim do job, para retomá-lo após um reinício)
+DIRETORIO_UPLOADS = os.getenv('UPLOAD_DIRETORIO', os.path.join(os.getcwd(), 'uploads'))
+
+# Cópia em memória dos uploads pequenos, por id do job (só para a execução neste processo; a
+# retomada usa o arquivo)
+_conteudos = {}
+
+
+class RequisicaoUpload(Request):
+    """
+    Request que mantém em memória os arquivos recebidos até LIMITE_MEMORIA (o padrão do
+    Werkzeug grava em disco tudo que passa de 500KB).
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA, mode='rb+')
+
+
+def guardar_upload(job, arquivo):
+    """
+    Guarda o conteúdo do upload para o job: copiado em blocos para um arquivo com nome único
+    (job.arquivo), gravado antes da resposta para que o job possa ser retomado por qualquer
+    processo. Se couber em LIMITE_MEMORIA, fica também uma cópia em memória para a execução
+    neste processo.
+    """
+    arquivo.seek(0, os.SEEK_END)
+    tamanho = arquivo.tell()
+    arquivo.seek(0)
+
+    os.makedirs(DIRETORIO_UPLOADS, exist_ok=True)
+    descritor, caminho = tempfile.mkstemp(prefix=f'{job.id}_', suffix='.xlsx', dir=DIRETORIO_UPLOADS)
+    with os.fdopen(descritor, 'wb') as destino:
+        shutil.copyfileobj(arquivo, destino, MB)
+    job.arquivo = caminho
+
+    if tamanho <= LIMITE_MEMORIA:
+        arquivo.seek(0)
+        _conteudos[job.id] = io.BytesIO(arquivo.read())
+
+
+def criar_job(arquivo, modo, opcoes=None):
+    """
+    Registra um novo job pendente no banco e retorna o objeto criado.
+    """
+    job = UploadJobModel(id=str(uuid.uuid4()), status='pendente', arquivo=arquivo, modo=modo, opcoes=opcoes or {})
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def enfileirar(app, job_id, status_atual='pendente'):
+    return executor.submit(_executar_job, app, job_id, status_atual)
+
+
+def _reservar(job_id, status_atual):
+    """
+    Marca o job como 'processando' de forma atômica, para que só um processo o execute.
+    """
+    agora = datetime.utcnow()
+    consulta = UploadJobModel.query.filter_by(id=job_id, status=status_atual)
+    if status_atual == 'processando':
+        # Job órfão: só é reservado se continuar sem atualização recente
+        consulta = consulta.filter(UploadJobModel.atualizado_em < agora - TEMPO_ORFAO)
+    linhas = consulta.update(
+        {'status': 'processando', 'iniciado_em': agora, 'atualizado_em': agora}
+    )
+    db.session.commit()
+    return linhas == 1
+
+
+def _resumir(resumo, linhas, inicio):
+    # Converte o resumo do processador em algo pequeno o bastante para ficar no banco
+    segundos = time.perf_counter() - inicio
+    resultado = {k: v for k, v in resumo.items() if k != 'falhas'}
+    resultado.update({
+        'linhas': linhas,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': round(linhas / segundos, 1) if segundos else None,
+        'total_falhas': len(resumo['falhas']),
+        'falhas': resumo['falhas'][:MAX_FALHAS]
+    })
+    return resultado
+
+
+def _executar_job(app, job_id, status_atual='pendente'):
+    with app.app_context():
+        # Sai da memória mesmo que outro processo já tenha reservado o job
+        conteudo = _conteudos.pop(job_id, None)
+        try:
+            if not _reservar(job_id, status_atual):
+                return
+
+            job = db.session.get(UploadJobModel, job_id)
+            origem = conteudo or job.arquivo
+            if origem is None or (conteudo is None and not os.path.exists(origem)):
+                raise RuntimeError('Conteúdo do upload não está mais disponível. Envie a planilha novamente.')
+            print(f"--- Job {job_id}: processando {job.arquivo} ({'em memória' if conteudo else 'do disco'}, modo {job.modo}) ---")
+
+            resultado = {}
+            inicios = {}
+            relogio = {'ultimo': time.perf_counter()}
+
+            def progresso(aba, resumo, linhas):
+                # O tempo de cada aba conta a partir do fim da aba anterior (inclui a leitura)
+                inicio = inicios.setdefault(aba, relogio['ultimo'])
+                resultado[aba] = _resumir(resumo, linhas, inicio)
+
+                # Atribui um novo dict para que o SQLAlchemy detecte a alteração na coluna JSON
+                job.resultado = dict(resultado)
+                job.atualizado_em = datetime.utcnow()
+                db.session.commit()
+                relogio['ultimo'] = time.perf_counter()
+
+            # Importado só aqui: o pipeline da planilha (pandas/numpy) não é carregado pelos
+            # processos que só atendem a API, e sim no primeiro job de upload
+            from processador_planilha import ProcessadorExcel
+            
+            processador = ProcessadorExcel(modo=job.modo, **(job.opcoes or {}))
+            processador.executar(origem, progresso=progresso)
+            _finalizar(job_id, 'concluido')
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro no job {job_id}: {e}")
+            
+            # Planilha recusada na validação (abortar_invalidos): o relatório vai para o resultado do job
+            relatorio = getattr(e, 'relatorio', None)
+            resultado = None
+            if relatorio:
+                resultado = {aba: {'total_falhas': len(f), 'falhas': f[:MAX_FALHAS]} for aba, f in relatorio.items()}
+            _finalizar(job_id, 'erro', str(e), resultado)
+        finally:
+            db.session.remove()
+
+
+def _finalizar(job_id, status, erro=None, resultado=None):
+    job = db.session.get(UploadJobModel, job_id)
+    if job is None:
+        return
+
+    job.status = status
+    job.erro = erro
+    if resultado is not None:
+        job.resultado = resultado
+    job.finalizado_em = job.atualizado_em = datetime.utcnow()
+    db.session.commit()
+
+    # Limpeza do arquivo temporário
+    if job.arquivo and os.path.exists(job.arquivo):
+        os.remove(job.arquivo)
+
+
+def retomar_pendentes(app):
+    """
+    Reenfileira os jobs que ficaram para trás quando o processo foi reiniciado: os pendentes e
+    os que estavam 'processando' sem atualização recente. Estes últimos são retomados em modo
+    'upsert', já que parte dos lotes pode ter sido gravada antes da interrupção. Vários processos
+    podem chamar isto ao mesmo tempo: a reserva em _reservar deixa cada job com um só deles.
+    Retorna os futures dos jobs enfileirados.
+    """
+    with app.app_context():
+        limite = datetime.utcnow() - TEMPO_ORFAO
+        
+        pendentes = UploadJobModel.query.filter(UploadJobModel.status == 'pendente').all()
+        orfaos = UploadJobModel.query.filter(
+            UploadJobModel.status == 'processando', UploadJobModel.atualizado_em < limite
+        ).all()
+
+        for job in orfaos:
+            if job.modo == 'inserir':
+                job.modo = 'upsert'
+        db.session.commit()
+
+        futuros = [enfileirar(app, job.id) for job in pendentes]
+        futuros += [enfileirar(app, job.id, 'processando') for job in orfaos]
+
+        if futuros:
+            print(f"--- {len(futuros)} job(s) de upload retomado(s) ---")
+        return futuros
+
+
+def instalar(app):
+    """
+    Retoma os jobs interrompidos em qualquer servidor WSGI: cada processo do servidor, na sua
+    primeira requisição, chama retomar_pendentes. Registra também o comando
+    `flask retomar-jobs`, que executa os jobs interrompidos fora do servidor e espera terminarem.
+    """
+    estado = {'retomado': False}
+    trava = threading.Lock()
+
+    @app.before_request
+    def retomar_jobs_interrompidos():
+        if estado['retomado']:
+            return
+        with trava:
+            if estado['retomado']:
+                return
+            estado['retomado'] = True
+        retomar_pendentes(app)
+
+    @app.cli.command('retomar-jobs')
+    def retomar_jobs():
+        """Executa os jobs de upload pendentes e órfãos e espera terminarem."""
+        wait(retomar_pendentes(app))
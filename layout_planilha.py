@@ -0,0 +1,33 @@
+from models import EspecialidadeModel, MedicoModel, ResponsavelModel, PlanoModel, CirurgiaModel
+
+# --- Layout da planilha de tags ---
+# Abas, colunas e modos da importação. Fica separado do processador_planilha (que carrega
+# pandas/numpy) para que a API use essas informações sem importar o pipeline da planilha.
+
+# Modos de gravação aceitos:
+# 'inserir'     -> apenas INSERT (falha em nomes repetidos nas tabelas com nome único)
+# 'upsert'      -> casa as linhas pelo nome normalizado e atualiza as existentes
+# 'incremental' -> como o upsert, mas só grava as linhas cujo hash mudou desde a última importação
+MODOS = ('inserir', 'upsert', 'incremental')
+
+# Mapa: Nome da aba no Excel -> Tabela no Banco de Dados
+MAPA_TABELAS = {
+    'Médicos': MedicoModel,
+    'Responsáveis': ResponsavelModel,
+    'Planos': PlanoModel,
+    'Especialidades': EspecialidadeModel,
+    'Cirurgias': CirurgiaModel
+}
+
+# Colunas esperadas no Excel
+CAMPOS = {
+    'Médicos': ['Nome', 'Especialidade', 'Tipo'],
+    'Responsáveis': ['Nome', 'Email', 'Telefone'],
+    'Planos': ['Nome', 'Sigla'],
+    'Especialidades': ['Nome', 'Descrição'],
+    'Cirurgias': ['Nome', 'Especialidade Relacionada']
+}
+
+
+def aba_do_model(model):
+    return next(aba for aba, Modelo in MAPA_TABELAS.items() if Modelo is model)
@@ -0,0 +1,225 @@
+import os
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from models import db, EspecialidadeModel, ResponsavelModel, MedicoModel, CirurgiaModel, PlanoModel
+from versionamento import versoes
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- Snapshot de lookup ---
+# Pares id/nome das tags ativas de todas as tabelas, para os front-ends preencherem os
+# dropdowns com uma só requisição (/api/lookup). O snapshot fica na memória do processo já
+# serializado e comprimido (gzip e, com o pacote brotli instalado, br), e só as tabelas cuja
+# versão (ver versionamento.py) mudou são relidas do banco.
+#
+# A versão do snapshot junta as versões das tabelas na ordem de TABELAS (ex.: "3.0.12.1.4").
+# Com ?since=<versao> a resposta traz só o que mudou desde ela, a partir do histórico de
+# alterações de cada tabela guardado em memória; tabelas fora do histórico vêm completas.
+
+TABELAS = {
+    'especialidades': EspecialidadeModel,
+    'responsaveis': ResponsavelModel,
+    'medicos': MedicoModel,
+    'cirurgias': CirurgiaModel,
+    'planos': PlanoModel
+}
+
+# Tentativas de ler uma tabela sem que a versão dela mude durante a leitura
+TENTATIVAS_LEITURA = 3
+
+
+def codificar_versao(numeros):
+    return '.'.join(str(numeros[nome]) for nome in TABELAS)
+
+
+def decodificar_versao(versao):
+    """
+    Converte a versão recebida em ?since em {tabela: versão}. ValueError se for inválida.
+    """
+    partes = versao.split('.')
+    if len(partes) != len(TABELAS) or not all(p.isdigit() for p in partes):
+        raise ValueError(f"Versão inválida: '{versao}'.")
+    return {nome: int(p) for nome, p in zip(TABELAS, partes)}
+
+
+def comprimir(corpo):
+    """
+    Representações do corpo (bytes) por Content-Encoding, comprimidas uma única vez.
+    """
+    representacoes = {'identity': corpo, 'gzip': gzip.compress(corpo, compresslevel=6)}
+    if brotli is not None:
+        representacoes['br'] = brotli.compress(corpo)
+    return representacoes
+
+
+def _pares(itens):
+    return [{'id': id, 'nome': nome} for id, nome in itens.items()]
+
+
+def _json(dados):
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+
+
+class HistoricoTabela:
+    """
+    Estado atual de uma tabela no lookup ({id: nome} dos ativos e o JSON já pronto) mais as
+    últimas alterações entre versões, usadas para montar os deltas.
+    """
+
+    def __init__(self, max_alteracoes):
+        self.versao = None
+        self.itens = {}
+        self.json = '[]'
+        # versão de origem -> (versão de destino, {id: nome} novos ou alterados, ids removidos)
+        self.alteracoes = OrderedDict()
+        self.max_alteracoes = max_alteracoes
+
+    def atualizar(self, versao, itens, consistente=True):
+        # Versão menor que a atual (banco recriado) ou leitura inconsistente: o histórico não vale mais
+        if self.versao is None or versao < self.versao or not consistente:
+            self.alteracoes.clear()
+        else:
+            alterados = {id: nome for id, nome in itens.items() if self.itens.get(id) != nome}
+            removidos = self.itens.keys() - itens.keys()
+            self.alteracoes[self.versao] = (versao, alterados, removidos)
+            while len(self.alteracoes) > self.max_alteracoes:
+                self.alteracoes.popitem(last=False)
+
+        self.versao = versao
+        self.itens = itens
+        self.json = _json(_pares(itens))
+
+    def delta(self, desde):
+        """
+        Retorna (alterados, removidos) de <desde> até a versão atual, ou None se o histórico
+        não cobre <desde>.
+        """
+        alterados, removidos = {}, set()
+        versao = desde
+        while versao != self.versao:
+            if versao not in self.alteracoes:
+                return None
+            versao, novos, excluidos = self.alteracoes[versao]
+            removidos -= novos.keys()
+            alterados.update(novos)
+            for id in excluidos:
+                alterados.pop(id, None)
+            removidos |= excluidos
+        return alterados, removidos
+
+
+class SnapshotLookup:
+
+    def __init__(self):
+        self.tabelas = {nome: HistoricoTabela(int(os.getenv('LOOKUP_HISTORICO', 50))) for nome in TABELAS}
+        self.max_deltas = int(os.getenv('LOOKUP_MAX_DELTAS', 64))
+        # (versão, representações do snapshot completo), trocado de uma vez a cada reconstrução
+        self._atual = (None, None)
+        # versão de origem -> representações do delta até a versão atual
+        self._deltas = OrderedDict()
+        self._lock = threading.Lock()
+        self.contadores = {'reconstrucoes': 0, 'tabelas_relidas': 0, 'deltas_montados': 0}
+
+    def _versoes(self, nomes):
+        tabelas = {TABELAS[nome].__tablename__: nome for nome in nomes}
+        return {tabelas[t]: v for t, (v, _) in versoes(tabelas).items()}
+
+    def _ler(self, nome):
+        """
+        Lê os ativos da tabela conferindo a versão antes e depois: como toda escrita incrementa
+        a versão na mesma transação, versões iguais garantem que os dados são os daquela versão.
+        """
+        Model = TABELAS[nome]
+        ativos = db.or_(Model.ativo.is_(None), Model.ativo == True)
+        consulta = select(Model.id, Model.nome).where(ativos).order_by(Model.id)
+
+        versao = self._versoes([nome])[nome]
+        for _ in range(TENTATIVAS_LEITURA):
+            itens = dict(db.session.execute(consulta).tuples().all())
+            depois = self._versoes([nome])[nome]
+            if depois == versao:
+                return versao, itens, True
+            versao = depois
+        return versao, itens, False
+
+    def _reconstruir(self, numeros):
+        for nome, historico in self.tabelas.items():
+            if historico.versao != numeros[nome]:
+                historico.atualizar(*self._ler(nome))
+                self.contadores['tabelas_relidas'] += 1
+
+        versao = codificar_versao({nome: h.versao for nome, h in self.tabelas.items()})
+        # O corpo é montado com o JSON já pronto de cada tabela (só as relidas foram serializadas de novo)
+        tabelas = ','.join(f'{_json(nome)}:{h.json}' for nome, h in self.tabelas.items())
+        corpo = f'{{"versao":{_json(versao)},"tabelas":{{{tabelas}}}}}'.encode()
+
+        self._atual = (versao, comprimir(corpo))
+        self._deltas.clear()
+        self.contadores['reconstrucoes'] += 1
+
+    def atual(self):
+        """
+        Retorna (versão, representações do snapshot completo), relendo só as tabelas alteradas.
+        """
+        numeros = self._versoes(TABELAS)
+        if self._atual[0] != codificar_versao(numeros):
+            with self._lock:
+                if self._atual[0] != codificar_versao(numeros):
+                    self._reconstruir(numeros)
+        return self._atual
+
+    def delta(self, desde):
+        """
+        Retorna (versão, representações do delta desde a versão <desde>). Só entram as tabelas
+        alteradas: com 'alterados' e 'removidos', ou com 'completo' se <desde> saiu do histórico.
+        """
+        numeros_desde = decodificar_versao(desde)
+        versao, _ = self.atual()
+
+        with self._lock:
+            # O snapshot pode ter mudado entre atual() e o lock: o delta sai sempre contra o estado guardado
+            versao = self._atual[0]
+            chave = (desde, versao)
+            representacoes = self._deltas.get(chave)
+            if representacoes is not None:
+                self._deltas.move_to_end(chave)
+                return versao, representacoes
+
+            tabelas = {}
+            for nome, historico in self.tabelas.items():
+                if numeros_desde[nome] == historico.versao:
+                    continue
+                delta = historico.delta(numeros_desde[nome])
+                if delta is None:
+                    tabelas[nome] = {'completo': _pares(historico.itens)}
+                else:
+                    alterados, removidos = delta
+                    tabelas[nome] = {'alterados': _pares(alterados), 'removidos': sorted(removidos)}
+
+            corpo = _json({'versao': versao, 'desde': desde, 'tabelas': tabelas}).encode()
+            representacoes = comprimir(corpo)
+            self._deltas[chave] = representacoes
+            while len(self._deltas) > self.max_deltas:
+                self._deltas.popitem(last=False)
+            self.contadores['deltas_montados'] += 1
+            return versao, representacoes
+
+    def estatisticas(self):
+        versao, representacoes = self._atual
+        return {
+            **self.contadores,
+            'versao': versao,
+            'bytes': {codificacao: len(corpo) for codificacao, corpo in (representacoes or {}).items()},
+            'deltas_em_memoria': len(self._deltas)
+        }
+
+
+snapshot_lookup = SnapshotLookup()
@@ -0,0 +1,325 @@
+import io
+import os
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Métricas ---
+# Histogramas e contadores em memória, expostos no formato texto do Prometheus em /metrics.
+# Cada processo mantém os próprios valores (com vários workers, o Prometheus coleta cada um).
+# Também implementa o profiling opcional de uma única requisição (?profile=1 ou X-Profile).
+
+PREFIXO = 'tags'
+
+# Limites dos buckets (segundos) e de contagem de consultas SQL
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# Fases da importação medidas pelo ProcessadorExcel
+FASES_IMPORTACAO = ('leitura', 'normalizacao', 'validacao', 'resolucao_fk', 'insercao')
+
+
+def _rotulos(nomes, valores, extra=''):
+    pares = [f'{n}="{v}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Contador:
+
+    tipo = 'counter'
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = f'{PREFIXO}_{nome}'
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *rotulos, valor=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def linhas(self):
+        with self._lock:
+            valores = dict(self._valores)
+        for rotulos, valor in sorted(valores.items()):
+            yield f'{self.nome}{_rotulos(self.rotulos, rotulos)} {valor}'
+
+
+class Histograma:
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, descricao, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        self.nome = f'{PREFIXO}_{nome}'
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self.buckets = tuple(buckets)
+        # rotulos -> [contagem por bucket (não cumulativa), soma, total]
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *rotulos):
+        with self._lock:
+            serie = self._valores.get(rotulos)
+            if serie is None:
+                serie = self._valores[rotulos] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def linhas(self):
+        with self._lock:
+            valores = {r: (list(s[0]), s[1], s[2]) for r, s in self._valores.items()}
+        for rotulos, (contagens, soma, total) in sorted(valores.items()):
+            # No formato do Prometheus os buckets são cumulativos
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                le = f'le="{limite}"'
+                yield f'{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {acumulado}'
+            le = 'le="+Inf"'
+            yield f'{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {total}'
+            yield f'{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {round(soma, 6)}'
+            yield f'{self.nome}_count{_rotulos(self.rotulos, rotulos)} {total}'
+
+
+class RegistroMetricas:
+
+    def __init__(self):
+        self.metricas = []
+        # Funções chamadas a cada coleta, para valores lidos na hora (ex.: pool de conexões)
+        self.coletores = []
+
+    def contador(self, *args, **kwargs):
+        metrica = Contador(*args, **kwargs)
+        self.metricas.append(metrica)
+        return metrica
+
+    def histograma(self, *args, **kwargs):
+        metrica = Histograma(*args, **kwargs)
+        self.metricas.append(metrica)
+        return metrica
+
+    def texto(self):
+        """
+        Todas as métricas no formato de exposição do Prometheus (text/plain; version=0.0.4).
+        """
+        saida = []
+        for metrica in self.metricas:
+            saida.append(f'# HELP {metrica.nome} {metrica.descricao}')
+            saida.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            saida.extend(metrica.linhas())
+
+        # Coletores devolvem (nome, descrição, [(dict de rótulos, valor)]) de gauges
+        for coletor in self.coletores:
+            for nome, descricao, amostras in coletor():
+                nome = f'{PREFIXO}_{nome}'
+                saida.append(f'# HELP {nome} {descricao}')
+                saida.append(f'# TYPE {nome} gauge')
+                for rotulos, valor in amostras:
+                    saida.append(f'{nome}{_rotulos(rotulos.keys(), rotulos.values())} {valor}')
+        return '\n'.join(saida) + '\n'
+
+
+registro = RegistroMetricas()
+
+latencia = registro.histograma(
+    'http_requisicao_segundos', 'Latência das requisições por endpoint.', ('endpoint', 'metodo', 'status')
+)
+consultas_sql = registro.histograma(
+    'sql_consultas_por_requisicao', 'Consultas SQL executadas por requisição.', ('endpoint', 'metodo'),
+    buckets=BUCKETS_CONSULTAS
+)
+tempo_sql = registro.histograma(
+    'sql_segundos_por_requisicao', 'Tempo gasto em consultas SQL por requisição.', ('endpoint', 'metodo')
+)
+tempo_serializacao = registro.histograma(
+    'serializacao_segundos', 'Tempo de serialização das respostas por requisição.', ('endpoint',)
+)
+fases_importacao = registro.histograma(
+    'importacao_fase_segundos', 'Tempo de cada fase da importação por aba.', ('aba', 'fase')
+)
+linhas_importadas = registro.contador(
+    'importacao_linhas_total', 'Linhas processadas pela importação de planilhas.', ('aba',)
+)
+
+
+# --- Medição dentro das requisições ---
+
+def _atual():
+    # Acumuladores da requisição corrente (None fora de uma requisição)
+    if has_request_context():
+        return g.get('_metricas')
+    return None
+
+
+@contextmanager
+def medir_serializacao():
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        atual = _atual()
+        if atual is not None:
+            atual['serializacao'] += time.perf_counter() - inicio
+
+
+@contextmanager
+def cronometro(tempos, fase):
+    """
+    Soma em tempos[fase] o tempo gasto dentro do bloco (usado nas fases da importação).
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tempos[fase] = tempos.get(fase, 0.0) + time.perf_counter() - inicio
+
+
+def registrar_importacao(aba, tempos, linhas):
+    for fase, segundos in tempos.items():
+        fases_importacao.observar(segundos, aba, fase)
+    linhas_importadas.incrementar(aba, valor=linhas)
+
+
+def _antes_da_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    # O início fica no contexto de execução da própria consulta (uma consulta com erro não deixa resto)
+    if contexto is not None:
+        contexto._metricas_inicio = time.perf_counter()
+
+
+def _depois_da_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    atual = _atual()
+    inicio = getattr(contexto, '_metricas_inicio', None)
+    if atual is not None and inicio is not None:
+        atual['consultas'] += 1
+        atual['sql'] += time.perf_counter() - inicio
+
+
+# --- Profiling de uma requisição ---
+
+def _profiling_pedido():
+    if os.getenv('PROFILE_HABILITADO', '0') != '1':
+        return False
+    return request.args.get('profile') in ('1', 'true') or request.headers.get('X-Profile') in ('1', 'true')
+
+
+def _iniciar_profiler():
+    if os.getenv('PROFILE_FERRAMENTA', 'cprofile') == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        except ImportError:
+            print("pyinstrument não instalado, usando cProfile.")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _relatorio(profiler):
+    """
+    Para o profiler e devolve o relatório em texto (e grava o dump em PROFILE_DIRETORIO, se definido).
+    """
+    diretorio = os.getenv('PROFILE_DIRETORIO')
+    nome = f"{request.method}{request.path.replace('/', '_')}_{int(time.time() * 1000)}"
+
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+            profiler.dump_stats(os.path.join(diretorio, nome + '.prof'))
+        saida = io.StringIO()
+        pstats.Stats(profiler, stream=saida).sort_stats('cumulative').print_stats(50)
+        return saida.getvalue()
+
+    profiler.stop()
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+        with open(os.path.join(diretorio, nome + '.html'), 'w', encoding='utf-8') as arquivo:
+            arquivo.write(profiler.output_html())
+    return profiler.output_text()
+
+
+# --- Integração com o app ---
+
+def instalar(app):
+    """
+    Registra os hooks de requisição, os eventos do SQLAlchemy e os coletores do pool, do cache e do lookup.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _antes_da_consulta):
+        event.listen(Engine, 'before_cursor_execute', _antes_da_consulta)
+        event.listen(Engine, 'after_cursor_execute', _depois_da_consulta)
+
+    @app.before_request
+    def iniciar_metricas():
+        g._metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'sql': 0.0, 'serializacao': 0.0}
+        if _profiling_pedido():
+            g._profiler = _iniciar_profiler()
+
+    @app.after_request
+    def registrar_metricas(resposta):
+        atual = g.pop('_metricas', None)
+        if atual is None:
+            return resposta
+
+        endpoint = request.url_rule.rule if request.url_rule else 'sem_rota'
+        latencia.observar(time.perf_counter() - atual['inicio'], endpoint, request.method, resposta.status_code)
+        consultas_sql.observar(atual['consultas'], endpoint, request.method)
+        tempo_sql.observar(atual['sql'], endpoint, request.method)
+        if atual['serializacao']:
+            tempo_serializacao.observar(atual['serializacao'], endpoint)
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            # A resposta vira o relatório do profiler; o status original segue no cabeçalho
+            relatorio = Response(_relatorio(profiler), mimetype='text/plain')
+            relatorio.headers['X-Profile-Status'] = str(resposta.status_code)
+            relatorio.headers['X-Profile-SQL'] = f"{atual['consultas']} consultas, {atual['sql'] * 1000:.1f} ms"
+            return relatorio
+        return resposta
+
+    def coletar_pool():
+        from models import db
+        from conexoes import estatisticas_pool
+
+        with app.app_context():
+            estatisticas = estatisticas_pool(db.engines)
+        for contador in ('checkedout', 'checkedin', 'overflow', 'size'):
+            amostras = [({'engine': chave}, e[contador]) for chave, e in estatisticas.items() if contador in e]
+            if amostras:
+                yield f'pool_{contador}', f'Pool de conexões: {contador}.', amostras
+
+    def coletar_cache():
+        from cache import cache_respostas
+
+        estatisticas = cache_respostas.estatisticas()
+        for chave, valor in estatisticas.items():
+            if isinstance(valor, int) and not isinstance(valor, bool):
+                yield f'cache_{chave}', f'Cache de respostas: {chave}.', [({}, valor)]
+
+    def coletar_lookup():
+        from lookup import snapshot_lookup
+
+        estatisticas = snapshot_lookup.estatisticas()
+        for chave in ('reconstrucoes', 'tabelas_relidas', 'deltas_montados'):
+            yield f'lookup_{chave}', f'Snapshot de lookup: {chave}.', [({}, estatisticas[chave])]
+        amostras = [({'codificacao': c}, tamanho) for c, tamanho in estatisticas['bytes'].items()]
+        if amostras:
+            yield 'lookup_bytes', 'Tamanho do snapshot de lookup por codificação.', amostras
+
+    registro.coletores = [coletar_pool, coletar_cache, coletar_lookup]
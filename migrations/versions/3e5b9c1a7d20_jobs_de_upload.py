@@ -0,0 +1,41 @@
+"""jobs de upload
+
+Revision ID: 3e5b9c1a7d20
+Revises: 60207775ac5e
+Create Date: 2026-10-18 08:36:55.104312
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e5b9c1a7d20'
+down_revision = '60207775ac5e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados com db.create_all antes das migrações podem já ter a tabela
+    if sa.inspect(op.get_bind()).has_table('upload_job'):
+        return
+
+    op.create_table('upload_job',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('arquivo', sa.String(length=500), nullable=True),
+    sa.Column('modo', sa.String(length=20), nullable=True),
+    sa.Column('opcoes', sa.JSON(), nullable=True),
+    sa.Column('resultado', sa.JSON(), nullable=True),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=True),
+    sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+    sa.Column('finalizado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('upload_job')
@@ -0,0 +1,87 @@
+"""indices de busca
+
+Revision ID: 5d2a8f4c9e61
+Revises: b08e70f620f5
+Create Date: 2026-10-18 10:12:31.480227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8f4c9e61'
+down_revision = 'b08e70f620f5'
+branch_labels = None
+depends_on = None
+
+# Colunas indexadas para o ?search= de cada tabela (as de busca.CAMPOS_BUSCA que existem nela).
+# No SQLite: tabela virtual FTS5 <tabela>_fts mantida por triggers; no MySQL: índice FULLTEXT ft_<tabela>.
+# Atenção: no SQLite, uma migração que recrie uma destas tabelas (batch_alter_table com recreate)
+# apaga os triggers, que precisam ser criados de novo nela.
+COLUNAS = {
+    'especialidade': ('nome',),
+    'responsavel': ('nome', 'email'),
+    'medico': ('nome',),
+    'cirurgia': ('nome',),
+    'plano': ('nome', 'sigla')
+}
+
+
+def _fts5(tabela, colunas):
+    fts = f'{tabela}_fts'
+    lista = ', '.join(colunas)
+    novos = ', '.join(f'new.{c}' for c in colunas)
+    antigos = ', '.join(f'old.{c}' for c in colunas)
+
+    # remove_diacritics ignora acentos; prefix acelera as buscas por prefixo
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5("
+        f"{lista}, content='{tabela}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+        f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {tabela} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); "
+        f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END"
+    )
+    # Indexa as linhas que já existem
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    conexao = op.get_bind()
+    dialeto = conexao.dialect.name
+
+    if dialeto == 'sqlite':
+        # SQLite compilado sem FTS5: a busca continua com LIKE
+        if not conexao.execute(sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+            print("FTS5 indisponível neste SQLite: a busca vai usar LIKE.")
+            return
+
+        for tabela, colunas in COLUNAS.items():
+            _fts5(tabela, colunas)
+
+    elif dialeto == 'mysql':
+        for tabela, colunas in COLUNAS.items():
+            op.execute(f"ALTER TABLE {tabela} ADD FULLTEXT INDEX ft_{tabela} ({', '.join(colunas)})")
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+
+    for tabela in COLUNAS:
+        if dialeto == 'sqlite':
+            for sufixo in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {tabela}_fts_{sufixo}")
+            op.execute(f"DROP TABLE IF EXISTS {tabela}_fts")
+        elif dialeto == 'mysql':
+            op.execute(f"ALTER TABLE {tabela} DROP INDEX ft_{tabela}")
@@ -0,0 +1,33 @@
+"""versoes das tabelas
+
+Revision ID: c94f2e6b1a83
+Revises: 3e5b9c1a7d20
+Create Date: 2026-10-18 08:36:58.772915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c94f2e6b1a83'
+down_revision = '3e5b9c1a7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados com db.create_all antes das migrações podem já ter a tabela
+    if sa.inspect(op.get_bind()).has_table('versao_tabela'):
+        return
+
+    op.create_table('versao_tabela',
+    sa.Column('tabela', sa.String(length=50), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('tabela')
+    )
+
+
+def downgrade():
+    op.drop_table('versao_tabela')
@@ -1,6 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
 
-db = SQLAlchemy()
+from conexoes import SessaoRoteada
+
+# A sessão roteada manda as leituras dos GETs para a réplica, se houver (ver conexoes.py)
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 # Criando tabelas do DB
 class EspecialidadeModel(db.Model):
@@ -11,7 +15,7 @@ class EspecialidadeModel(db.Model):
     
     nome = db.Column(db.String(100), unique=True, nullable=False)
     descricao = db.Column(db.String(500))
-    ativo = db.Column(db.Boolean, default=True)
+    ativo = db.Column(db.Boolean, default=True, index=True)
 
 
 class CirurgiaModel(db.Model):
@@ -22,9 +26,9 @@ class CirurgiaModel(db.Model):
     
     nome = db.Column(db.String(100), unique=True, nullable=False)
     
-    # Foreign key de especialidade
-    id_especialidade = db.Column(db.Integer, db.ForeignKey('especialidade.id', ondelete='SET NULL'))
-    ativo = db.Column(db.Boolean, default=True)
+    # Foreign key de especialidade (indexada: usada no JOIN das listagens e no SET NULL)
+    id_especialidade = db.Column(db.Integer, db.ForeignKey('especialidade.id', ondelete='SET NULL'), index=True)
+    ativo = db.Column(db.Boolean, default=True, index=True)
     
     especialidade = db.relationship('EspecialidadeModel')
 
@@ -34,13 +38,14 @@ class MedicoModel(db.Model):
     # Primary key que se auto-incrementa.
     id = db.Column(db.Integer, primary_key=True)
     
-    nome = db.Column(db.String(100), nullable=False)
+    # Sem unique: o índice atende a busca por nome e o upsert da importação
+    nome = db.Column(db.String(100), nullable=False, index=True)
     tipo = db.Column(db.String(100))
 
-    # Foreign key de especialidade
-    id_especialidade = db.Column(db.Integer, db.ForeignKey('especialidade.id', ondelete='SET NULL')) 
+    # Foreign key de especialidade (indexada: usada no JOIN das listagens e no SET NULL)
+    id_especialidade = db.Column(db.Integer, db.ForeignKey('especialidade.id', ondelete='SET NULL'), index=True) 
     pacientes = db.Column(db.Integer)
-    ativo = db.Column(db.Boolean, default=True)
+    ativo = db.Column(db.Boolean, default=True, index=True)
     
     especialidade = db.relationship('EspecialidadeModel')
     
@@ -50,11 +55,11 @@ class ResponsavelModel(db.Model):
     # Primary key que se auto-incrementa.
     id = db.Column(db.Integer, primary_key=True)
     
-    nome = db.Column(db.String(100), nullable=False)
+    nome = db.Column(db.String(100), nullable=False, index=True)
     email = db.Column(db.String(200))
     telefone = db.Column(db.String(50))
     pacientes = db.Column(db.Integer)
-    ativo = db.Column(db.Boolean, default=True)
+    ativo = db.Column(db.Boolean, default=True, index=True)
 
 class PlanoModel(db.Model):
     __tablename__ = 'plano'
@@ -65,4 +70,61 @@ class PlanoModel(db.Model):
     nome = db.Column(db.String(100), unique=True, nullable=False)
     sigla = db.Column(db.String(10))
     pacientes = db.Column(db.Integer)
-    ativo = db.Column(db.Boolean, default=True)
\ No newline at end of file
+    ativo = db.Column(db.Boolean, default=True, index=True)
+
+# Jobs de upload de planilhas (processados em segundo plano)
+class UploadJobModel(db.Model):
+    __tablename__ = 'upload_job'
+
+    # Primary key: uuid gerado no momento do upload.
+    id = db.Column(db.String(36), primary_key=True)
+    
+    # pendente -> processando -> concluido | erro
+    status = db.Column(db.String(20), nullable=False, default='pendente')
+    arquivo = db.Column(db.String(500))
+    modo = db.Column(db.String(20), default='inserir')
+    
+    # Demais opções do ProcessadorExcel (ex.: criar_referencias)
+    opcoes = db.Column(db.JSON)
+    
+    # Contagens, vazão e erros por aba
+    resultado = db.Column(db.JSON)
+    erro = db.Column(db.Text)
+    
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    finalizado_em = db.Column(db.DateTime)
+
+# Versão de cada tabela de tags, incrementada a cada escrita (CRUD ou importação).
+# Usada para invalidar caches e gerar ETags sem consultar as tabelas em si.
+class VersaoTabelaModel(db.Model):
+    __tablename__ = 'versao_tabela'
+
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Hash de cada linha gravada pelo modo incremental da importação, por tabela e nome normalizado.
+# Linhas da planilha com o mesmo hash da última importação não são regravadas.
+class ImpressaoLinhaModel(db.Model):
+    __tablename__ = 'impressao_linha'
+
+    tabela = db.Column(db.String(50), primary_key=True)
+    nome = db.Column(db.String(100), primary_key=True)
+    hash = db.Column(db.String(40), nullable=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Contadores agregados das tabelas de tags (ver resumos.py): totais da tabela (grupo '') e por
+# FK (ex.: grupo 'id_especialidade', chave = id da especialidade; 0 para FK nula).
+class ResumoContagemModel(db.Model):
+    __tablename__ = 'resumo_contagem'
+
+    tabela = db.Column(db.String(50), primary_key=True)
+    grupo = db.Column(db.String(50), primary_key=True)
+    chave = db.Column(db.Integer, primary_key=True)
+    registros = db.Column(db.Integer, nullable=False, default=0)
+    ativos = db.Column(db.Integer, nullable=False, default=0)
+    pacientes = db.Column(db.Integer, nullable=False, default=0)
+    pacientes_ativos = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,137 +1,886 @@
+import os
+import json
+import queue
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from graphlib import TopologicalSorter
+from datetime import datetime
+
 import pandas as pd
 import numpy as np
-from models import db, EspecialidadeModel, MedicoModel, ResponsavelModel, PlanoModel, CirurgiaModel
+import openpyxl
+from sqlalchemy import insert, update, delete, select, func, bindparam
+from sqlalchemy.dialects import sqlite, mysql
+from models import db, EspecialidadeModel, ImpressaoLinhaModel
+from layout_planilha import MODOS, MAPA_TABELAS, CAMPOS
+from versionamento import registrar_alteracao
+from resumos import contabilizar, alterando
+from metricas import FASES_IMPORTACAO, cronometro, registrar_importacao
+
+# Máximo de valores distintos não resolvidos listados no resumo de cada aba
+MAX_NAO_RESOLVIDOS = 100
+
+# Modo paralelo: lotes limpos que cada aba pode deixar à espera da gravação. Com a fila cheia
+# o processo da aba para de ler até a gravação consumir os lotes
+LOTES_EM_ESPERA = 4
+
+# Validação das linhas antes da gravação: formato do email e quantidade de dígitos do telefone
+# (após remover tudo que não é dígito; 8 a 13 cobre números locais, com DDD e com DDI)
+EMAIL_VALIDO = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+TELEFONE_DIGITOS = (8, 13)
+
+class PlanilhaInvalida(ValueError):
+    """
+    Planilha recusada na validação (com abortar_invalidos): nada foi gravado. O relatório
+    traz, por aba, as linhas inválidas com os erros de cada uma.
+    """
+
+    def __init__(self, relatorio):
+        self.relatorio = relatorio
+        total = sum(len(linhas) for linhas in relatorio.values())
+        super().__init__(f"Planilha com {total} linha(s) inválida(s) ({', '.join(relatorio)}); nada foi gravado.")
+
+class ResolvedorFK:
+    """
+    Converte nomes da planilha em ids de uma tabela referenciada (ex.: especialidade).
+    A tabela é carregada uma única vez por importação num pd.Index de nomes normalizados,
+    e cada lote é resolvido de uma vez só com get_indexer (sem loop em Python).
+    """
+
+    def __init__(self, modelo, criar_ausentes=False, simular=False):
+        self.modelo = modelo
+        self.tabela = modelo.__table__
+        self.criar_ausentes = criar_ausentes
+        
+        # Na simulação nada é gravado: nomes novos recebem um id provisório (-1)
+        self.simular = simular
+        self._indice = None
+        self._ids = None
+
+    @staticmethod
+    def normalizar(valores):
+        return valores.astype(str).str.lower().str.strip()
+
+    def _carregar(self):
+        print(f"   -> Carregando nomes e IDs da tabela {self.tabela.name}...")
+        registros = db.session.execute(select(self.tabela.c.nome, self.tabela.c.id)).all()
+        self._indice = pd.Index([])
+        self._ids = np.array([], dtype='int64')
+        self._adicionar([r[0] for r in registros], [r[1] for r in registros])
+
+    def _adicionar(self, nomes, ids):
+        nomes = self.normalizar(pd.Series(nomes, dtype=object))
+        novos = pd.DataFrame({'nome': nomes.values, 'id': np.asarray(ids, dtype='int64')})
+        
+        # O get_indexer exige nomes únicos: em caso de repetição (após normalizar) vale o primeiro
+        novos = novos[~novos['nome'].isin(self._indice)].drop_duplicates('nome')
+        self._indice = self._indice.append(pd.Index(novos['nome']))
+        self._ids = np.concatenate([self._ids, novos['id'].to_numpy()])
+
+    def registrar(self, nomes):
+        """
+        Inclui no mapa as linhas gravadas nesta mesma importação (ex.: aba Especialidades).
+        """
+        if self._indice is None:
+            # Fora da simulação as linhas já estão no banco e entram quando a tabela for carregada
+            if not self.simular:
+                return
+            self._carregar()
+        
+        faltando = [n for n in set(nomes) if n is not None and n not in self._indice]
+        if faltando:
+            registros = db.session.execute(
+                select(self.tabela.c.nome, self.tabela.c.id).where(self.tabela.c.nome.in_(faltando))
+            ).all()
+            self._adicionar([r[0] for r in registros], [r[1] for r in registros])
+        
+        if self.simular:
+            provisorios = [n for n in faltando if n not in self._indice]
+            self._adicionar(provisorios, [-1] * len(provisorios))
+
+    def _criar(self, nomes):
+        # Cria em massa as referências ausentes (só o nome; demais colunas ficam com o default)
+        if self.simular:
+            print(f"   -> (simulação) {len(nomes)} registro(s) seriam criados em {self.tabela.name}")
+            self._adicionar(nomes, [-1] * len(nomes))
+            return
+        
+        print(f"   -> Criando {len(nomes)} registro(s) ausente(s) em {self.tabela.name}...")
+        try:
+            linhas = [{'nome': n} for n in nomes]
+            db.session.execute(insert(self.tabela), linhas)
+            contabilizar(self.tabela, depois=linhas)
+            registrar_alteracao(self.tabela.name)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"   Erro ao criar registros em {self.tabela.name}: {e.__cause__ or e}")
+            return
+        self.registrar(nomes)
+
+    def resolver(self, valores):
+        """
+        Retorna (ids, nao_resolvidos): a série de ids (None onde não achou) e, para cada valor
+        preenchido (normalizado) que não existe na tabela referenciada, uma grafia de exemplo
+        como veio na planilha e a quantidade de ocorrências.
+        """
+        if self._indice is None:
+            self._carregar()
+        
+        preenchidos = valores.notna() & (valores.astype(str).str.strip() != '')
+        normalizados = self.normalizar(valores)
+        posicoes = self._indice.get_indexer(normalizados)
+        
+        ausentes = preenchidos.to_numpy() & (posicoes == -1)
+        if ausentes.any() and self.criar_ausentes:
+            self._criar(list(pd.unique(normalizados[ausentes])))
+            posicoes = self._indice.get_indexer(normalizados)
+            ausentes = preenchidos.to_numpy() & (posicoes == -1)
+        
+        # Só as posições encontradas indexam self._ids (que fica vazio se a tabela estiver vazia);
+        # as demais ficam None
+        encontrados = posicoes >= 0
+        ids = np.full(len(valores), None, dtype=object)
+        ids[encontrados] = self._ids[posicoes[encontrados]].tolist()
+        ids = pd.Series(ids, index=valores.index, dtype=object)
+
+        # Agrupa pelo valor normalizado (o mesmo usado na busca): grafias diferentes do mesmo
+        # nome contam juntas, com a primeira delas como exemplo
+        grupos = pd.DataFrame({
+            'chave': normalizados[ausentes],
+            'exemplo': valores[ausentes].astype(str).str.strip()
+        }).groupby('chave', sort=False)['exemplo'].agg(['first', 'size'])
+        nao_resolvidos = {chave: (g['first'], int(g['size'])) for chave, g in grupos.iterrows()}
+        return ids, nao_resolvidos
 
 class ProcessadorExcel:
     
-    def __init__(self):
+    # Modos de gravação aceitos (descritos em layout_planilha)
+    MODOS = MODOS
+
+    def __init__(self, tamanho_lote=1000, modo='inserir', criar_referencias=False, paralelo=False,
+                 desativar_ausentes=False, simular=False, abortar_invalidos=False):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo inválido: {modo}. Use um de {self.MODOS}.")
+        if (desativar_ausentes or simular) and modo != 'incremental':
+            raise ValueError("desativar_ausentes e simular só valem no modo incremental.")
+
+        # Quantidade de linhas enviadas ao banco por INSERT (executemany) e por commit
+        self.tamanho_lote = tamanho_lote
+        self.modo = modo
+
+        # Cria automaticamente (em massa) as especialidades citadas que não existirem no banco
+        self.criar_referencias = criar_referencias
+
+        # Lê e limpa as abas em paralelo (um processo por aba) antes da gravação
+        self.paralelo = paralelo
+        
+        # Modo incremental: marca como inativas (ativo=False) as linhas de importações anteriores
+        # que não estão mais na planilha
+        self.desativar_ausentes = desativar_ausentes
+        
+        # Modo incremental: só calcula o resumo (inserções, atualizações, desativações), sem gravar
+        self.simular = simular
+        
+        # Valida a planilha inteira antes de gravar e desiste (PlanilhaInvalida) se houver linhas
+        # inválidas. Sem essa opção as linhas inválidas só são puladas e listadas nas falhas
+        self.abortar_invalidos = abortar_invalidos
+
+        # Resolvedores de FK por tabela referenciada e valores não resolvidos por aba,
+        # montados uma vez por importação
+        self._resolvedores = {}
+        self._nao_resolvidos = {}
+        
+        # Tempo gasto em cada fase (leitura, normalizacao, validacao, resolucao_fk, insercao) da aba atual
+        self._tempos = {}
+        
+        # Nomes da aba atual vistos na planilha (modo incremental)
+        self._vistos = set()
+        
+        # Validação da aba atual: linha da planilha em que cada nome apareceu primeiro e
+        # linhas recusadas ainda não incluídas no resumo
+        self._nomes_aba = {}
+        self._invalidos = []
+
         # Mapa: Nome da aba no Excel -> Tabela no Banco de Dados
-        self.mapa_tabelas = {
-            'Médicos': MedicoModel,
-            'Responsáveis': ResponsavelModel,
-            'Planos': PlanoModel,
-            'Especialidades': EspecialidadeModel,
-            'Cirurgias': CirurgiaModel
-        }
+        self.mapa_tabelas = dict(MAPA_TABELAS)
 
         # Colunas esperadas no Excel
-        self.campos = {
-            'Médicos': ['Nome', 'Especialidade', 'Tipo'],
-            'Responsáveis': ['Nome', 'Email', 'Telefone'],
-            'Planos': ['Nome', 'Sigla'],
-            'Especialidades': ['Nome', 'Descrição'],
-            'Cirurgias': ['Nome', 'Especialidade Relacionada']
-        }
+        self.campos = {aba: list(colunas) for aba, colunas in CAMPOS.items()}
+
+    def _resolvedor(self, modelo_referencia):
+        tabela = modelo_referencia.__tablename__
+        if tabela not in self._resolvedores:
+            self._resolvedores[tabela] = ResolvedorFK(modelo_referencia, self.criar_referencias, self.simular)
+        return self._resolvedores[tabela]
 
-    def _resolver_ids(self, df, modelo_referencia, col_excel, col_banco):
+    def _resolver_ids(self, df, modelo_referencia, col_excel, col_banco, planilha_nome):
         """
-        Converte nomes (texto) da planilha em IDs (inteiros) consultando o banco."
+        Converte nomes (texto) da planilha em IDs (inteiros) usando o resolvedor da tabela referenciada.
         """
         if col_excel not in df.columns:
             return df
-            
-        print(f"   -> Buscando IDs para coluna '{col_excel}' na tabela {modelo_referencia.__tablename__}...")
-
-        # Busca todos os pares (nome, id) do banco
-        registros = modelo_referencia.query.with_entities(modelo_referencia.nome, modelo_referencia.id).all()
         
-        # Cria mapa: {'cardiologia': 1, 'pediatria': 2}
-        mapa_ids = {str(r.nome).lower().strip(): r.id for r in registros}
+        df[col_banco], nao_resolvidos = self._resolvedor(modelo_referencia).resolver(df[col_excel])
         
-        # Mapeia os valores. Use o map para substituir pelo ID
-        df[col_banco] = df[col_excel].astype(str).str.lower().str.strip().map(mapa_ids)
+        # Acumula os valores sem correspondência para o resumo da aba
+        contagem = self._nao_resolvidos.setdefault(planilha_nome, {})
+        for chave, (exemplo, ocorrencias) in nao_resolvidos.items():
+            if chave in contagem:
+                contagem[chave]['ocorrencias'] += ocorrencias
+            elif len(contagem) < MAX_NAO_RESOLVIDOS:
+                contagem[chave] = {'exemplo': exemplo, 'ocorrencias': ocorrencias}
         
         # Remove a coluna original de texto
         df = df.drop(columns=[col_excel])
         
         return df
 
-    def processar_planilha(self, excel_caminho, planilha_nome):
-        print(f"Lendo aba: {planilha_nome}...")
+    def _ler_planilha(self, workbook, planilha_nome):
+        """
+        Lê a aba em streaming (openpyxl em modo read-only), gerando DataFrames de até
+        tamanho_lote linhas. Assim o consumo de memória depende do lote, não do tamanho da aba.
+        """
+        campos = self.campos[planilha_nome]
         
-        df = pd.read_excel(
-            excel_caminho, 
-            sheet_name=planilha_nome, 
-            skiprows=1, 
-            usecols=self.campos[planilha_nome]
-        )
+        # A 1ª linha é o título da aba e a 2ª o cabeçalho
+        linhas = workbook[planilha_nome].iter_rows(min_row=2, values_only=True)
+        cabecalho = list(next(linhas, ()))
         
+        faltando = [c for c in campos if c not in cabecalho]
+        if faltando:
+            raise ValueError(f"Aba '{planilha_nome}' sem as colunas esperadas: {', '.join(faltando)}")
+        indices = [cabecalho.index(c) for c in campos]
+
+        # O índice dos DataFrames é o número da linha na planilha (usado nos relatórios de erro)
+        lote, numeros = [], []
+        for numero, linha in enumerate(linhas, start=3):
+            valores = [linha[i] if i < len(linha) else None for i in indices]
+            
+            # Ignora linhas totalmente vazias (ex.: formatação residual no fim da aba)
+            if all(v is None for v in valores):
+                continue
+            
+            lote.append(valores)
+            numeros.append(numero)
+            if len(lote) == self.tamanho_lote:
+                yield pd.DataFrame(lote, columns=campos, index=numeros, dtype=object)
+                lote, numeros = [], []
+
+        if lote:
+            yield pd.DataFrame(lote, columns=campos, index=numeros, dtype=object)
+
+    def processar_planilha(self, workbook, planilha_nome):
+        """
+        Gera, lote a lote, os registros válidos e normalizados da aba, prontos para o banco,
+        junto com o número da linha da planilha de cada um.
+        """
+        print(f"Lendo aba: {planilha_nome}...")
+        
+        leitor = self._ler_planilha(workbook, planilha_nome)
+        while True:
+            with cronometro(self._tempos, 'leitura'):
+                df = next(leitor, None)
+            if df is None:
+                break
+            
+            with cronometro(self._tempos, 'normalizacao'):
+                df = self._limpar(df)
+            yield self._normalizar(df, planilha_nome)
+
+    @staticmethod
+    def _limpar(df):
+        """
+        Tratamentos que não dependem do banco (podem rodar em outro processo). Cada coluna é
+        normalizada uma única vez, no próprio DataFrame: os valores viram texto sem espaços nas
+        pontas e células vazias (ou só com espaços) ficam nulas.
+        """
         # Converte cabeçalhos para minúsculo
         df.columns = df.columns.str.lower()
+        df.rename(columns={
+            'descrição': 'descricao',
+            'especialidade relacionada': 'especialidade_temp' 
+        }, inplace=True)
         
-        # --- TRATAMENTO 1: NOMES EM MINÚSCULO ---
-        if 'nome' in df.columns:
-            # Converte para string, joga pra minusculo e remove espaços nas pontas
-            df['nome'] = df['nome'].astype(str).str.lower().str.strip()
-
-        # --- TRATAMENTO 2: LIMPEZA DE TELEFONE (APENAS NÚMEROS) ---
-        if 'telefone' in df.columns:
+        for coluna in df.columns:
+            # Números (ex.: telefone digitado como número) também viram texto; as células vazias
+            # voltam a ser nulas no fim, em vez de virarem o texto 'nan'/'None'
+            vazios = df[coluna].isna()
+            texto = df[coluna].astype(str).str.strip()
+            
+            # --- TRATAMENTO 1: NOMES EM MINÚSCULO ---
+            if coluna == 'nome':
+                texto = texto.str.lower()
+            
+            # --- TRATAMENTO 2: LIMPEZA DE TELEFONE (APENAS NÚMEROS) ---
             # Regex r'\D' significa "Qualquer coisa que NÃO seja um dígito (0-9)"
-            # Substituímos tudo que não é dígito por vazio ''
-            df['telefone'] = df['telefone'].astype(str).str.replace(r'\D', '', regex=True)
+            elif coluna == 'telefone':
+                texto = texto.str.replace(r'\D', '', regex=True)
+            
+            texto[vazios | (texto == '')] = np.nan
+            df[coluna] = texto
 
-        df = df.rename(columns={
-            'descrição': 'descricao',
-            'especialidade relacionada': 'especialidade_temp' 
-        })
+        return df
+    
+    def _validar(self, df, planilha_nome):
+        """
+        Valida o lote limpo de uma só vez (operações vetorizadas, sem consultar o banco):
+        colunas obrigatórias e tamanho máximo das colunas de texto (tirados do models.py),
+        formato de email e telefone e nomes repetidos na aba, inclusive em lotes anteriores.
+        Retorna só as linhas válidas; as inválidas vão para self._invalidos.
+        """
+        tabela = self.mapa_tabelas[planilha_nome].__table__
+        erros = {}
+        comprimentos = {}
+        
+        for coluna in tabela.c:
+            if coluna.name not in df.columns:
+                continue
+            valores = df[coluna.name]
+            if not coluna.nullable and not coluna.primary_key and coluna.default is None:
+                erros[f'{coluna.name}: obrigatório'] = valores.isna()
+            tamanho = getattr(coluna.type, 'length', None)
+            if tamanho:
+                comprimentos[coluna.name] = valores.str.len()
+                erros[f'{coluna.name}: mais de {tamanho} caracteres'] = comprimentos[coluna.name] > tamanho
+        
+        if 'email' in df.columns:
+            erros['email: formato inválido'] = df['email'].notna() & ~df['email'].str.match(EMAIL_VALIDO, na=False)
+        if 'telefone' in df.columns:
+            # O _limpar já deixou só os dígitos
+            minimo, maximo = TELEFONE_DIGITOS
+            digitos = comprimentos.get('telefone', df['telefone'].str.len())
+            erros[f'telefone: deve ter de {minimo} a {maximo} dígitos'] = df['telefone'].notna() & ~digitos.between(minimo, maximo)
+        
+        mascaras = pd.DataFrame(erros, index=df.index, dtype=bool)
+        invalidas = mascaras.any(axis=1)
+        
+        # Nomes repetidos: vale a 1ª ocorrência válida (de um lote anterior da aba ou deste lote);
+        # linhas recusadas pelas outras regras não contam como 1ª ocorrência
+        repetidos = pd.Series(False, index=df.index)
+        if 'nome' in df.columns:
+            nomes = df['nome'][~invalidas].dropna()
+            primeiros = nomes[~nomes.duplicated(keep='first')]
+            
+            # Só os nomes novos neste lote são procurados no dict nome -> 1ª linha da aba
+            anteriores = pd.Series([self._nomes_aba.get(nome) for nome in primeiros], index=primeiros.index, dtype=object)
+            novos = anteriores.isna()
+            self._nomes_aba.update(zip(primeiros[novos], primeiros.index[novos]))
+            
+            linha_original = pd.Series(anteriores.where(~novos, primeiros.index).to_numpy(), index=primeiros.to_numpy())
+            primeira = nomes.map(linha_original)
+            repetidos = (primeira != nomes.index).reindex(df.index, fill_value=False)
+            invalidas |= repetidos
+        
+        if not invalidas.any():
+            return df
+        
+        # Mensagens montadas só para as linhas recusadas
+        colunas = mascaras.columns.to_numpy()
+        for numero, linha in zip(df.index[invalidas], mascaras[invalidas].to_numpy()):
+            mensagens = list(colunas[linha])
+            if repetidos[numero]:
+                mensagens.append(f"nome: repetido na planilha (1ª ocorrência na linha {int(primeira[numero])})")
+            self._invalidos.append({
+                'linha': int(numero),
+                'dados': df.loc[numero].where(df.loc[numero].notna(), None).to_dict(),
+                'erro': '; '.join(mensagens)
+            })
+        
+        return df[~invalidas]
+    
+    def validar(self, excel_caminho):
+        """
+        Lê e valida todas as abas, sem consultar nem gravar no banco. Retorna
+        {aba: [linhas inválidas]}, só com as abas que têm problemas.
+        """
+        relatorio = {}
+        workbook = openpyxl.load_workbook(excel_caminho, read_only=True, data_only=True)
+        try:
+            for aba in self.ordem_abas():
+                if aba not in workbook.sheetnames or aba not in self.campos:
+                    continue
+                
+                self._nomes_aba, self._invalidos = {}, []
+                for df in self._ler_planilha(workbook, aba):
+                    self._validar(self._limpar(df), aba)
+                if self._invalidos:
+                    relatorio[aba] = self._invalidos
+        finally:
+            workbook.close()
+            self._nomes_aba, self._invalidos = {}, []
+        
+        return relatorio
 
+    def _normalizar(self, df, planilha_nome):
+        """
+        Valida o lote limpo, resolve as FKs (consulta o banco) e converte as linhas válidas em
+        registros prontos para gravação. Retorna (registros, linhas da planilha).
+        """
+        with cronometro(self._tempos, 'validacao'):
+            df = self._validar(df, planilha_nome)
+        
         # --- TRATAMENTO DE FK (Foreign Keys) ---
-        if planilha_nome == 'Médicos':
-            df = self._resolver_ids(df, EspecialidadeModel, 'especialidade', 'id_especialidade')
+        with cronometro(self._tempos, 'resolucao_fk'):
+            if planilha_nome == 'Médicos':
+                df = self._resolver_ids(df, EspecialidadeModel, 'especialidade', 'id_especialidade', planilha_nome)
 
-        elif planilha_nome == 'Cirurgias':
-            col_busca = 'especialidade_temp' if 'especialidade_temp' in df.columns else 'especialidade relacionada'
-            df = self._resolver_ids(df, EspecialidadeModel, col_busca, 'id_especialidade')
+            elif planilha_nome == 'Cirurgias':
+                col_busca = 'especialidade_temp' if 'especialidade_temp' in df.columns else 'especialidade relacionada'
+                df = self._resolver_ids(df, EspecialidadeModel, col_busca, 'id_especialidade', planilha_nome)
 
-        # --- LIMPEZA FINAL (NaN -> None) ---
-        # Converte valores vazios/NaN e strings "nan" (geradas pela conversão de texto) em None
-        df = df.replace({np.nan: None, 'nan': None, '': None})
-        
-        # Garante que None seja passado corretamente para o SQLAlchemy
-        df = df.where(pd.notnull(df), None)
+        with cronometro(self._tempos, 'normalizacao'):
+            # --- LIMPEZA FINAL (NaN -> None) ---
+            # Vazios já ficaram nulos no _limpar; garante que cheguem ao SQLAlchemy como None
+            df = df.astype(object).where(df.notna(), None)
 
-        return df.to_dict('records')
+            return df.to_dict('records'), df.index.tolist()
     
-    def salvar_no_banco(self, dados, Modelo):
-        if not dados:
-            return
+    @staticmethod
+    def _classificar(lote, tabela):
+        """
+        Casa cada linha do lote pelo nome normalizado com as do banco. Retorna as colunas comparadas,
+        as linhas novas, as alteradas [(id, linha)] e a contagem por resultado.
+        """
+        colunas = [c for c in lote[0].keys() if c != 'nome']
+
+        # Busca, em uma única consulta, as linhas do banco com os mesmos nomes do lote
+        nomes = {item['nome'] for item in lote if item.get('nome') is not None}
+        consulta = select(tabela.c.id, tabela.c.nome, *[tabela.c[c] for c in colunas]).where(tabela.c.nome.in_(nomes))
+        existentes = {r.nome: r for r in db.session.execute(consulta)}
+
+        novos, alterados = [], []
+        for item in lote:
+            atual = existentes.get(item.get('nome'))
+            if atual is None:
+                novos.append(item)
+            elif any(getattr(atual, c) != item[c] for c in colunas):
+                alterados.append((atual.id, item))
+
+        contagem = {'inseridos': len(novos), 'atualizados': len(alterados), 'inalterados': len(lote) - len(novos) - len(alterados)}
+        return colunas, novos, alterados, contagem
+
+    def _upsert_lote(self, lote, tabela):
+        """
+        Grava o lote casando cada linha pelo nome normalizado. Linhas novas são inseridas,
+        linhas com algum valor diferente são atualizadas e linhas idênticas são ignoradas (sem escrita).
+        """
+        colunas, novos, alterados, contagem = self._classificar(lote, tabela)
+        dialeto = db.session.get_bind().dialect.name
+
+        # Resumos de /api/stats: diferença das linhas alteradas (antes e depois) e as novas
+        with alterando(tabela, [id_ for id_, _ in alterados]):
+            if tabela.c.nome.unique and dialeto in ('sqlite', 'mysql') and (novos or alterados):
+                # Tabelas com nome único: um único INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE
+                linhas = novos + [item for _, item in alterados]
+                if dialeto == 'sqlite':
+                    stmt = sqlite.insert(tabela)
+                    stmt = stmt.on_conflict_do_update(index_elements=[tabela.c.nome], set_={c: stmt.excluded[c] for c in colunas})
+                else:
+                    stmt = mysql.insert(tabela)
+                    stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in colunas})
+                db.session.execute(stmt, linhas)
+            else:
+                # Tabelas sem nome único (Médicos, Responsáveis): INSERT dos novos e UPDATE em massa por id
+                if novos:
+                    db.session.execute(insert(tabela), novos)
+                if alterados:
+                    stmt = update(tabela).where(tabela.c.id == bindparam('_id')).values({c: bindparam(f'_{c}') for c in colunas})
+                    db.session.execute(stmt, [{'_id': id_, **{f'_{c}': item[c] for c in colunas}} for id_, item in alterados])
+        contabilizar(tabela, depois=novos)
+
+        return contagem
+
+    @staticmethod
+    def _impressao(item):
+        # Hash estável do registro normalizado (ordem das chaves fixa; tipos não-JSON viram texto)
+        return hashlib.sha1(json.dumps(item, sort_keys=True, default=str).encode()).hexdigest()
 
-        print(f"--- Inserindo {len(dados)} registros em {Modelo.__tablename__} ---")
-        sucessos = 0
+    def _gravar_impressoes(self, tabela, impressoes):
+        """
+        Grava (insere ou substitui) o hash das linhas do lote na tabela impressao_linha.
+        """
+        agora = datetime.utcnow()
+        linhas = [{'tabela': tabela, 'nome': nome, 'hash': h, 'atualizado_em': agora} for nome, h in impressoes.items()]
+        impressao = ImpressaoLinhaModel.__table__
+        dialeto = db.session.get_bind().dialect.name
+
+        if dialeto == 'sqlite':
+            stmt = sqlite.insert(impressao)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[impressao.c.tabela, impressao.c.nome],
+                set_={'hash': stmt.excluded.hash, 'atualizado_em': stmt.excluded.atualizado_em}
+            )
+        elif dialeto == 'mysql':
+            stmt = mysql.insert(impressao)
+            stmt = stmt.on_duplicate_key_update({'hash': stmt.inserted.hash, 'atualizado_em': stmt.inserted.atualizado_em})
+        else:
+            db.session.execute(delete(impressao).where(impressao.c.tabela == tabela, impressao.c.nome.in_(impressoes)))
+            stmt = insert(impressao)
+        db.session.execute(stmt, linhas)
+
+    def _incremental_lote(self, lote, tabela):
+        """
+        Compara o hash de cada linha com o da última importação e envia ao upsert só as linhas
+        novas ou alteradas. Na simulação apenas classifica as linhas, sem gravar.
+        """
+        # O hash é só dos dados da planilha: o ativo=True abaixo não muda as impressões
+        # (ligar ou desligar desativar_ausentes não regrava todas as linhas)
+        impressoes = {item['nome']: self._impressao(item) for item in lote if item.get('nome') is not None}
+        self._vistos.update(impressoes)
+
+        # A planilha passa a ser a lista de ativos: linhas que voltarem a ela são reativadas
+        if self.desativar_ausentes:
+            for item in lote:
+                item['ativo'] = True
+
+        impressao = ImpressaoLinhaModel.__table__
+        armazenadas = dict(db.session.execute(
+            select(impressao.c.nome, impressao.c.hash)
+            .where(impressao.c.tabela == tabela.name, impressao.c.nome.in_(impressoes))
+        ).all())
+
+        alterados = [
+            item for item in lote
+            if item.get('nome') is None or armazenadas.get(item['nome']) != impressoes[item['nome']]
+        ]
+        contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': len(lote) - len(alterados)}
+        if not alterados:
+            return contagem
+
+        if self.simular:
+            # Mesma comparação com o banco que o upsert faz, sem gravar
+            self._somar(contagem, self._classificar(alterados, tabela)[3])
+            return contagem
+
+        self._somar(contagem, self._upsert_lote(alterados, tabela))
+        self._gravar_impressoes(tabela.name, {
+            item['nome']: impressoes[item['nome']] for item in alterados if item.get('nome') is not None
+        })
+        return contagem
+
+    def _desativar_ausentes(self, Modelo, resumo):
+        """
+        Marca ativo=False nas linhas de importações anteriores (com hash guardado) que não
+        apareceram na planilha, e descarta os hashes delas para que voltem a ser gravadas
+        se reaparecerem.
+        """
+        tabela = Modelo.__table__
+        impressao = ImpressaoLinhaModel.__table__
         
-        for item in dados:
+        anteriores = db.session.scalars(select(impressao.c.nome).where(impressao.c.tabela == tabela.name))
+        ausentes = [nome for nome in anteriores if nome not in self._vistos]
+        
+        desativados = 0
+        for inicio in range(0, len(ausentes), self.tamanho_lote):
+            nomes = ausentes[inicio:inicio + self.tamanho_lote]
+            ativos = db.or_(tabela.c.ativo.is_(None), tabela.c.ativo == True)
+            
+            if self.simular:
+                desativados += db.session.scalar(
+                    select(func.count()).select_from(tabela).where(tabela.c.nome.in_(nomes), ativos)
+                )
+                continue
+            
+            ids = db.session.scalars(select(tabela.c.id).where(tabela.c.nome.in_(nomes), ativos)).all()
+            with alterando(tabela, ids):
+                resultado = db.session.execute(update(tabela).where(tabela.c.id.in_(ids)).values(ativo=False))
+            db.session.execute(delete(impressao).where(impressao.c.tabela == tabela.name, impressao.c.nome.in_(nomes)))
+            if resultado.rowcount:
+                registrar_alteracao(tabela.name)
+            db.session.commit()
+            desativados += resultado.rowcount
+        
+        resumo['desativados'] = desativados
+        if desativados:
+            print(f"   {'(simulação) ' if self.simular else ''}{desativados} linha(s) ausente(s) da planilha desativada(s) em {tabela.name}")
+
+    def _gravar_lote(self, lote, tabela):
+        """
+        Envia um lote ao banco conforme o modo escolhido e retorna a contagem de linhas por resultado.
+        """
+        if self.modo == 'incremental':
+            return self._incremental_lote(lote, tabela)
+        if self.modo == 'upsert':
+            return self._upsert_lote(lote, tabela)
+
+        db.session.execute(insert(tabela), lote)
+        contabilizar(tabela, depois=lote)
+        return {'inseridos': len(lote)}
+
+    @staticmethod
+    def _gravou(contagem):
+        # Se o lote escreveu alguma linha (reimportações sem mudanças não escrevem nada)
+        return any(contagem.get(chave) for chave in ('inseridos', 'atualizados'))
+
+    def _confirmar(self, tabela, contagem):
+        # Na simulação nada foi gravado: não há versão a incrementar nem commit a fazer
+        if self.simular:
+            return
+        # Só lotes que gravaram alguma linha mudam a versão (e invalidam cache, ETags e lookup)
+        if self._gravou(contagem):
+            registrar_alteracao(tabela.name)
+        db.session.commit()
+
+    def _somar(self, resumo, contagem):
+        for chave, valor in contagem.items():
+            resumo[chave] = resumo.get(chave, 0) + valor
+
+    def _apos_gravar(self, tabela, lote):
+        # Linhas gravadas numa tabela referenciada passam a valer para as abas seguintes
+        if tabela.name in self._resolvedores:
+            self._resolvedores[tabela.name].registrar([item.get('nome') for item in lote])
+
+    def _gravar_linha_a_linha(self, lote, tabela, inicio, resumo, numeros=None):
+        """
+        Reprocessa um lote que falhou, linha por linha, para identificar quais registros deram erro.
+        """
+        for posicao, item in enumerate(lote):
             try:
-                novo_objeto = Modelo(**item)
-                db.session.add(novo_objeto)
-                sucessos += 1
+                contagem = self._gravar_lote([item], tabela)
+                self._confirmar(tabela, contagem)
+                self._somar(resumo, contagem)
+                self._apos_gravar(tabela, [item])
             except Exception as e:
-                print(f"   Erro ao preparar item: {e}")
+                db.session.rollback()
+                falha = {'indice': inicio + posicao, 'dados': item, 'erro': str(e.__cause__ or e)}
+                if numeros:
+                    falha['linha'] = numeros[posicao]
+                resumo['falhas'].append(falha)
 
-        try:
-            db.session.commit()
-            print(f"Sucesso! {sucessos} itens processados.\n")
-        except Exception as e:
-            db.session.rollback()
-            print(f"Erro ao salvar lote: {e}\n")
+    def _novo_resumo(self):
+        resumo = {'inseridos': 0, 'invalidos': 0, 'falhas': []}
+        if self.modo in ('upsert', 'incremental'):
+            resumo.update({'atualizados': 0, 'inalterados': 0})
+        if self.desativar_ausentes:
+            resumo['desativados'] = 0
+        return resumo
+
+    def salvar_no_banco(self, dados, Modelo, resumo=None, deslocamento=0, numeros=None):
+        """
+        Grava os registros em lotes com INSERT em massa (executemany) do SQLAlchemy Core,
+        fazendo um commit por lote. No modo 'upsert' as linhas já existentes são atualizadas.
+        Retorna um resumo com as contagens e as linhas que falharam; para acumular vários
+        lotes da mesma aba, passe o resumo anterior e o deslocamento (linhas já gravadas).
+        Com numeros (linha da planilha de cada registro), as falhas indicam também a linha.
+        """
+        if resumo is None:
+            resumo = self._novo_resumo()
+        if not dados:
+            return resumo
+
+        tabela = Modelo.__table__
+        total = len(dados)
+        print(f"--- Gravando {total} registros em {tabela.name} (modo {self.modo}, lotes de {self.tamanho_lote}) ---")
+
+        for inicio in range(0, total, self.tamanho_lote):
+            lote = dados[inicio:inicio + self.tamanho_lote]
+            inicio += deslocamento
+
+            with cronometro(self._tempos, 'insercao'):
+                try:
+                    contagem = self._gravar_lote(lote, tabela)
+                    self._confirmar(tabela, contagem)
+                    self._somar(resumo, contagem)
+                    self._apos_gravar(tabela, lote)
+                except Exception as e:
+                    # Se o lote falhar, desfaz e tenta linha por linha para isolar os registros com problema
+                    db.session.rollback()
+                    print(f"   Erro no lote {inicio}-{inicio + len(lote)}: {e.__cause__ or e}")
+                    posicao = inicio - deslocamento
+                    self._gravar_linha_a_linha(lote, tabela, inicio, resumo, numeros and numeros[posicao:posicao + len(lote)])
+
+            print(f"   Progresso: {inicio + len(lote)}/{deslocamento + total} linhas")
+
+        contagens = ', '.join(f"{v} {k}" for k, v in resumo.items() if isinstance(v, int))
+        print(f"{'Simulação' if self.simular else 'Sucesso'}! {contagens}, {len(resumo['falhas'])} falhas.\n")
+        return resumo
+
+    def ordem_abas(self):
+        """
+        Ordena as abas pelas dependências entre os models (FKs): uma aba só é gravada
+        depois das abas das tabelas que ela referencia (ex.: Médicos após Especialidades).
+        """
+        aba_da_tabela = {Modelo.__tablename__: aba for aba, Modelo in self.mapa_tabelas.items()}
+        dependencias = {
+            aba: {
+                aba_da_tabela[fk.column.table.name]
+                for fk in Modelo.__table__.foreign_keys
+                if fk.column.table.name in aba_da_tabela
+            }
+            for aba, Modelo in self.mapa_tabelas.items()
+        }
+        return list(TopologicalSorter(dependencias).static_order())
 
-    def executar(self, excel_caminho):
-        # Ordem obrigatória para resolver dependências
-        ordem = ['Especialidades', 'Planos', 'Responsáveis', 'Médicos', 'Cirurgias']
+    def _ler_em_paralelo(self, excel_caminho, abas):
+        """
+        Envia a leitura + limpeza de cada aba para um pool de processos. Cada processo entrega
+        os DataFrames limpos, lote a lote, numa fila limitada da aba. Retorna o pool, o
+        gerenciador das filas e um dict aba -> (future, fila).
+        """
+        # Arquivo em memória: os bytes são enviados para cada processo
+        if hasattr(excel_caminho, 'read'):
+            excel_caminho.seek(0)
+            excel_caminho = excel_caminho.read()
+        
+        # spawn: não herda threads/conexões do processo da API (fork não é seguro aqui)
+        contexto = multiprocessing.get_context('spawn')
+        gerenciador = contexto.Manager()
+        pool = ProcessPoolExecutor(max_workers=min(len(abas), os.cpu_count() or 1), mp_context=contexto)
         
-        for aba in ordem:
-            if aba in self.campos:
-                dados = self.processar_planilha(excel_caminho, aba)
-                if dados:
-                    Modelo = self.mapa_tabelas[aba]
-                    self.salvar_no_banco(dados, Modelo)
+        leituras = {}
+        for aba in abas:
+            fila = gerenciador.Queue(maxsize=LOTES_EM_ESPERA)
+            futuro = pool.submit(_ler_aba_isolada, excel_caminho, aba, self.campos[aba], self.tamanho_lote, fila)
+            leituras[aba] = (futuro, fila)
+        return pool, gerenciador, leituras
+
+    def _lotes_do_pool(self, aba, futuro, fila):
+        """
+        Gera os lotes da aba à medida que o processo dela os entrega (até o None do fim),
+        já validados e com as FKs resolvidas.
+        """
+        while True:
+            # A leitura e a limpeza rodam no pool: conta como leitura o tempo esperando por elas
+            with cronometro(self._tempos, 'leitura'):
+                try:
+                    df = fila.get(timeout=1)
+                except queue.Empty:
+                    # Processo morto antes do None: result() levanta o erro (BrokenProcessPool).
+                    # Se terminou bem, o None já está na fila
+                    if futuro.done():
+                        futuro.result()
+                    continue
+            
+            if df is None:
+                # Erros da leitura (ex.: colunas faltando) são levantados aqui
+                futuro.result()
+                return
+            yield self._normalizar(df, aba)
+
+    def executar(self, excel_caminho, progresso=None):
+        """
+        Importa todas as abas da planilha. Se informado, progresso(aba, resumo, linhas)
+        é chamado após a gravação de cada lote.
+        """
+        # Com abortar_invalidos a planilha inteira é validada antes de qualquer gravação
+        if self.abortar_invalidos:
+            relatorio = self.validar(excel_caminho)
+            if relatorio:
+                raise PlanilhaInvalida(relatorio)
+            if hasattr(excel_caminho, 'seek'):
+                excel_caminho.seek(0)
+        
+        # Ordem de gravação calculada pelas FKs dos models
+        ordem = self.ordem_abas()
+        resultado = {}
+        self._resolvedores = {}
+        self._nao_resolvidos = {}
+        pool = gerenciador = None
+        
+        # O arquivo é aberto uma única vez e cada aba é lida em streaming, lote a lote
+        workbook = openpyxl.load_workbook(excel_caminho, read_only=True, data_only=True)
+        try:
+            # Abas ausentes são ignoradas (ex.: planilha exportada de uma única tabela)
+            ausentes = [aba for aba in ordem if aba not in workbook.sheetnames]
+            for aba in ausentes:
+                print(f"Aba {aba} não encontrada, ignorando.")
+            ordem = [aba for aba in ordem if aba not in ausentes and aba in self.campos]
+            
+            # Resolvedores das tabelas referenciadas criados antes da gravação: as linhas gravadas
+            # nas abas dessas tabelas (ex.: Especialidades) passam a valer para as abas seguintes
+            modelos = {Modelo.__tablename__: Modelo for Modelo in self.mapa_tabelas.values()}
+            for aba in ordem:
+                for fk in self.mapa_tabelas[aba].__table__.foreign_keys:
+                    if fk.column.table.name in modelos:
+                        self._resolvedor(modelos[fk.column.table.name])
+            
+            # No modo paralelo todas as abas são lidas ao mesmo tempo; a gravação continua na ordem
+            # das dependências, lote a lote, enquanto as abas seguintes ainda estão sendo lidas
+            if self.paralelo and len(ordem) > 1:
+                pool, gerenciador, leituras = self._ler_em_paralelo(excel_caminho, ordem)
+            
+            for aba in ordem:
+                Modelo = self.mapa_tabelas[aba]
+                resumo = None
+                linhas = gravadas = 0
+                self._tempos = {fase: 0.0 for fase in FASES_IMPORTACAO}
+                self._vistos = set()
+                self._nomes_aba, self._invalidos = {}, []
+                
+                if pool:
+                    lotes = self._lotes_do_pool(aba, *leituras[aba])
+                else:
+                    lotes = self.processar_planilha(workbook, aba)
+                
+                for dados, numeros in lotes:
+                    # Linhas recusadas na validação entram nas falhas sem chegar ao banco
+                    resumo = resumo or self._novo_resumo()
+                    resumo['invalidos'] += len(self._invalidos)
+                    resumo['falhas'].extend(self._invalidos)
+                    linhas += len(self._invalidos)
+                    self._invalidos = []
+                    
+                    resumo = self.salvar_no_banco(dados, Modelo, resumo, gravadas, numeros)
+                    gravadas += len(dados)
+                    linhas += len(dados)
+                    if self._nao_resolvidos.get(aba):
+                        resumo['nao_resolvidos'] = dict(self._nao_resolvidos[aba])
+                    resumo['tempos'] = {fase: round(s, 3) for fase, s in self._tempos.items()}
+                    if progresso:
+                        progresso(aba, resumo, linhas)
+                
+                # Só depois de ler a aba inteira se sabe quais linhas anteriores sumiram dela
+                if self.desativar_ausentes:
+                    resumo = resumo or self._novo_resumo()
+                    self._desativar_ausentes(Modelo, resumo)
+                    if progresso:
+                        progresso(aba, resumo, linhas)
+                
+                if resumo is not None:
+                    resultado[aba] = resumo
+                    registrar_importacao(aba, self._tempos, linhas)
+        finally:
+            workbook.close()
+            if pool:
+                # Encerrar o gerenciador derruba as filas: processos parados num put() terminam com erro
+                gerenciador.shutdown()
+                pool.shutdown(cancel_futures=True)
+
+        return resultado
+
+def _ler_aba_isolada(excel_caminho, aba, campos, tamanho_lote, fila):
+    """
+    Executada em outro processo: lê uma aba, aplica a limpeza que não depende do banco e
+    coloca cada lote limpo na fila, terminando com None (também em caso de erro).
+    """
+    import io
+    if isinstance(excel_caminho, bytes):
+        excel_caminho = io.BytesIO(excel_caminho)
+    
+    processador = ProcessadorExcel(tamanho_lote=tamanho_lote)
+    processador.campos = {aba: campos}
+    
+    workbook = openpyxl.load_workbook(excel_caminho, read_only=True, data_only=True)
+    try:
+        print(f"Lendo aba: {aba} (processo {os.getpid()})...")
+        for df in processador._ler_planilha(workbook, aba):
+            fila.put(ProcessadorExcel._limpar(df))
+    finally:
+        workbook.close()
+        fila.put(None)
 
 if __name__ == '__main__':
-    from app import app
+    from flask_migrate import downgrade, upgrade
+    from app import app, atualizar_esquema
     
     with app.app_context():
 
-        db.drop_all()
-        db.create_all()
+        # Recria o banco vazio pelas migrações (o mesmo esquema que a API usa)
+        atualizar_esquema()
+        downgrade(revision='base')
+        upgrade()
 
         processador = ProcessadorExcel() 
         processador.executar('template-upload-tags.xlsx')
\ No newline at end of file
@@ -1,15 +1,60 @@
-from flask_restful import Resource, reqparse, fields, marshal, abort
+from flask_restful import Resource, reqparse, fields, marshal, abort, inputs
 from models import *
 
 import os
+import json
+import base64
+import hashlib
 from werkzeug.utils import secure_filename
-from flask import request
-from processador_planilha import ProcessadorExcel
+from flask import request, current_app, Response, stream_with_context
+from werkzeug.http import http_date
+from sqlalchemy import insert, update, delete, select, bindparam
+from sqlalchemy.orm import joinedload
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from layout_planilha import MODOS, MAPA_TABELAS, CAMPOS, aba_do_model
+from jobs import criar_job, enfileirar, guardar_upload, TAMANHO_MAXIMO, MB
+from busca import buscar
+from serializacao import serializador
+from versionamento import tabelas_dependentes, versoes, registrar_alteracao
+from conexoes import estatisticas_pool
+from metricas import registro, medir_serializacao
+from cache import cache_respostas, chave_resposta
+from lookup import snapshot_lookup, TABELAS
+from resumos import contabilizar, alterando, totais, por_especialidade
+from exportacao import FORMATOS, gerar_ndjson, gerar_csv, gerar_xlsx
+
+# ETag forte e Last-Modified derivados da chave da resposta (resource + argumentos + versões
+# das tabelas). Retorna os cabeçalhos e, se o cliente já tem essa versão, a resposta 304.
+def validar_condicional(chave, versoes_tabelas):
+    etag = hashlib.sha1(chave.encode()).hexdigest()
+    cabecalhos = {'ETag': f'"{etag}"'}
+    
+    datas = [data for _, data in versoes_tabelas.values() if data is not None]
+    ultima_alteracao = max(datas).replace(microsecond=0) if datas else None
+    if ultima_alteracao:
+        cabecalhos['Last-Modified'] = http_date(ultima_alteracao)
+    
+    # If-None-Match tem precedência sobre If-Modified-Since
+    if request.if_none_match:
+        nao_modificado = request.if_none_match.contains(etag)
+    else:
+        desde = request.if_modified_since
+        nao_modificado = bool(desde and ultima_alteracao and ultima_alteracao <= desde.replace(tzinfo=None))
+    
+    if nao_modificado:
+        return cabecalhos, Response(status=304, headers=cabecalhos)
+    return cabecalhos, None
 
 # --- Resources genéricos ---
 # Essa parte do código define classes genéricas pai, que serão
 # posteriormente herdadas pelas classes Medico, Especialidade, Plano etc...
 
+# Query base do model, já carregando (JOIN) os relacionamentos usados nos fields.
+# Evita o N+1: sem isso cada item da página dispararia um SELECT extra no relacionamento.
+def consulta_com_relacionamentos(model, relacionamentos):
+    return model.query.options(*[joinedload(getattr(model, r)) for r in relacionamentos])
+
 # Resource que representa o endpoint que retorna todas as tags do tipo selecionado
 class DefaultsResource(Resource):
     
@@ -18,49 +63,133 @@ class DefaultsResource(Resource):
     model = None
     default_args = None
     
+    # Relacionamentos lidos pelos fields (ex.: 'especialidade' em especialidade.nome)
+    relacionamentos = ()
+    
     # Argumentos de paginação
     busca_args = reqparse.RequestParser()
     busca_args.add_argument('page', type=int, default=1, location='args')
     busca_args.add_argument('per_page', type=int, default=10, location='args')
     busca_args.add_argument('search', type=str, location='args')
+    busca_args.add_argument('count', type=inputs.boolean, default=True, location='args')
+    
+    # Argumentos da paginação por cursor (keyset)
+    busca_args.add_argument('cursor', type=str, location='args')
+    busca_args.add_argument('limit', type=int, location='args')
+    
+    # Filtro por status (?ativo=true|false), atendido pelo índice ix_<tabela>_ativo
+    busca_args.add_argument('ativo', type=inputs.boolean, location='args')
+
+    # O cursor é opaco para o cliente: o último id retornado, em JSON codificado em base64
+    @staticmethod
+    def codificar_cursor(ultimo_id):
+        return base64.urlsafe_b64encode(json.dumps({'id': ultimo_id}).encode()).decode()
+
+    @staticmethod
+    def decodificar_cursor(cursor):
+        try:
+            return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))['id'])
+        except Exception:
+            abort(400, message='Cursor inválido.')
+
+    # Serializador compilado a partir dos fields (None se algum field não puder ser compilado;
+    # nesse caso a listagem volta a usar o marshal sobre objetos ORM)
+    @classmethod
+    def serializador(cls):
+        try:
+            return serializador(cls.model, cls.default_fields)
+        except TypeError:
+            return None
 
     # GET
     def get(self):
         
-        # Fields de paginação
-        paginacao_fields = {
-        'pagina_atual': fields.Integer,
-        'total_paginas': fields.Integer,
-        'total_itens': fields.Integer,
-        'itens': fields.List(fields.Nested(self.default_fields)) 
-        }
-        
         # Processa os parâmetros do request.
         args = self.busca_args.parse_args()
+        
+        # Procura a resposta no cache (a chave inclui a versão atual das tabelas envolvidas)
+        tabelas = tabelas_dependentes(self.model)
+        versoes_tabelas = versoes(tabelas)
+        chave = chave_resposta(type(self).__name__, args, versoes_tabelas)
+        
+        # GET condicional: se o cliente já tem esta versão, responde 304 sem consultar as linhas
+        cabecalhos, nao_modificado = validar_condicional(chave, versoes_tabelas)
+        if nao_modificado:
+            return nao_modificado
+        
+        resposta = cache_respostas.obter(chave, tabelas)
+        if resposta is None:
+            resposta = self.listar(args)
+            cache_respostas.guardar(chave, resposta, tabelas)
+        
+        return resposta, 200, cabecalhos
+    
+    def listar(self, args):
          
-        # Sistema de pesquisa no DB
+        # Com cursor ou limit, usa a paginação por cursor (sem COUNT e sem OFFSET)
+        modo_cursor = args['cursor'] is not None or args['limit'] is not None
+        
+        # A query traz só as colunas dos fields (tuplas) quando há serializador compilado
+        compilado = self.serializador()
+        if compilado:
+            model_query = compilado.consulta()
+        else:
+            model_query = consulta_com_relacionamentos(self.model, self.relacionamentos)
+        
+        if args['ativo'] is not None:
+            model_query = model_query.filter(self.model.ativo == args['ativo'])
+        
+        # Sistema de pesquisa no DB (índice de texto; ordena por relevância fora do modo cursor)
         prompt = args['search']
         if prompt is not None:
-            model_query = self.model.query.filter(self.model.nome.like(f'%{prompt}%'))
-        else:
-            model_query = self.model.query
+            model_query = buscar(self.model, model_query, prompt, ordenar=not modo_cursor)
+        
+        if modo_cursor:
+            return self.get_cursor(model_query, args, compilado)
         
-         # Recebe e utiliza os valores de paginação na query
-        # (paginate() é um método padrão do flask que facilita este processo).    
+        # Recebe e utiliza os valores de paginação na query
+        # (paginate() é um método padrão do flask que facilita este processo).
+        # Com ?count=false o COUNT(*) não é executado e os totais voltam nulos.
         pagination = model_query.paginate(
-            page=args['page'], per_page=args['per_page'], error_out=False
+            page=args['page'], per_page=args['per_page'], error_out=False, count=args['count']
         )
         
-        # Estabelece as informações que serão retornadas ao usuário.
-        data = {
+        # Estabelece as informações que serão retornadas ao usuário
+        # (mesma estrutura e ordem de chaves do antigo paginacao_fields).
+        return {
             'pagina_atual': pagination.page,
-            'total_paginas': pagination.pages,
+            'total_paginas': pagination.pages if args['count'] else None,
             'total_itens': pagination.total,
-            'itens': pagination.items
+            'itens': self.serializar(pagination.items, compilado)
         }
+    
+    def serializar(self, itens, compilado):
+        with medir_serializacao():
+            if compilado:
+                return compilado.linhas(itens)
+            
+            # Usa os fields como molde pra formatação da resposta.
+            return marshal(itens, self.default_fields)
+    
+    def get_cursor(self, model_query, args, compilado):
+        
+        # limit=0 precisa chegar à validação abaixo (não pode cair no per_page)
+        limite = args['limit'] if args['limit'] is not None else args['per_page']
+        if limite < 1: abort(400, message='limit deve ser maior que zero.')
+        
+        # Busca a partir do último id visto (seek pelo índice da primary key)
+        if args['cursor']:
+            model_query = model_query.filter(self.model.id > self.decodificar_cursor(args['cursor']))
+        
+        # Busca um item a mais só para saber se existe uma próxima página
+        itens = model_query.order_by(self.model.id).limit(limite + 1).all()
+        proximo_cursor = self.codificar_cursor(itens[limite - 1].id) if len(itens) > limite else None
         
-        # Usa os fields como molde pra formatação da resposta.
-        return marshal(data, paginacao_fields)
+        return {
+            'limite': limite,
+            'proximo_cursor': proximo_cursor,
+            'itens': self.serializar(itens[:limite], compilado)
+        }
     
     # POST
     def post(self):
@@ -73,6 +202,9 @@ class DefaultsResource(Resource):
         # Tenta armazenar a tag no DB.
         try:
             db.session.add(nova_instancia)
+            db.session.flush()
+            contabilizar(self.model, depois=[nova_instancia])
+            registrar_alteracao(self.model)
             db.session.commit() 
             
             # Usa os fields como molde pra formatação da resposta.
@@ -89,17 +221,36 @@ class DefaultResource(Resource):
     model = None
     default_args = None
     
+    # Relacionamentos lidos pelos fields (ex.: 'especialidade' em especialidade.nome)
+    relacionamentos = ()
+    
     # GET
     def get(self, id):
         
-        # Busca pela tag com o id passado nos argumentos do request.
-        default = self.model.query.get(id)
+        # Procura a resposta no cache (a chave inclui a versão atual das tabelas envolvidas)
+        tabelas = tabelas_dependentes(self.model)
+        versoes_tabelas = versoes(tabelas)
+        chave = chave_resposta(type(self).__name__, {'id': id}, versoes_tabelas)
         
-        # Tratamento caso a tag não exista no DB
-        if not default: abort(404, message='Tag não existe.')
+        # GET condicional: se o cliente já tem esta versão, responde 304 sem consultar a tag
+        cabecalhos, nao_modificado = validar_condicional(chave, versoes_tabelas)
+        if nao_modificado:
+            return nao_modificado
         
-        # Usa os fields como molde pra formatação da resposta.
-        return marshal(default, self.default_fields)
+        resposta = cache_respostas.obter(chave, tabelas)
+        if resposta is None:
+            # Busca pela tag com o id passado nos argumentos do request.
+            default = consulta_com_relacionamentos(self.model, self.relacionamentos).get(id)
+            
+            # Tratamento caso a tag não exista no DB
+            if not default: abort(404, message='Tag não existe.')
+            
+            # Usa os fields como molde pra formatação da resposta.
+            with medir_serializacao():
+                resposta = marshal(default, self.default_fields)
+            cache_respostas.guardar(chave, resposta, tabelas)
+        
+        return resposta, 200, cabecalhos
     
     # PATCH (Update total ou parcial)
     def patch(self, id):
@@ -113,13 +264,16 @@ class DefaultResource(Resource):
         # Tratamento caso a tag não exista no DB
         if not default: abort(404, message='Tag não existe.')
         
-        # Itera sobre os argumentos do request, atualizando a tag no processo.
-        for key, value in args.items():
-            if value is not None:
-                setattr(default, key, value)
-        
         # Tenta atualizar o DB.
         try:
+            # Itera sobre os argumentos do request, atualizando a tag no processo
+            # (a diferença vai para os resumos de /api/stats).
+            with alterando(self.model, [id]):
+                for key, value in args.items():
+                    if value is not None:
+                        setattr(default, key, value)
+            
+            registrar_alteracao(self.model)
             db.session.commit()
             
             # Usa os fields como molde pra formatação da resposta.
@@ -138,13 +292,246 @@ class DefaultResource(Resource):
         
         # Tenta deletar a tag no DB.
         try:
-            db.session.delete(default)
+            with alterando(self.model, [id]):
+                db.session.delete(default)
+            registrar_alteracao(self.model)
             db.session.commit()
             return '', 204
         except Exception as e:
             db.session.rollback()
             return {'erro': f'Erro interno: {str(e)}'}, 500
 
+# Request "falso" com um único item do lote, para validar cada item com os *_args existentes
+class RequisicaoItem:
+    def __init__(self, item):
+        self.json = item
+        self.values = MultiDict()
+        self.args = MultiDict()
+        self.form = MultiDict()
+        self.headers = {}
+        self.cookies = {}
+        self.files = MultiDict()
+
+# Resource que representa as operações em lote (POST/PATCH/DELETE) de um tipo de tag
+class DefaultsBatchResource(Resource):
+    
+    # Atributos genéricos (serão alterados nas classes específicas)
+    model = None
+    default_args = None
+    
+    # Quantidade máxima de itens por lote
+    limite_itens = int(os.getenv('BATCH_LIMITE', 1000))
+    
+    # ?atomico=true -> tudo ou nada: qualquer item inválido cancela o lote inteiro
+    lote_args = reqparse.RequestParser()
+    lote_args.add_argument('atomico', type=inputs.boolean, default=False, location='args')
+    
+    def ler_itens(self):
+        # Aceita tanto um array quanto {"itens": [...]}
+        corpo = request.get_json(silent=True)
+        if isinstance(corpo, dict):
+            corpo = corpo.get('itens')
+        
+        if not isinstance(corpo, list) or not corpo:
+            abort(400, message='Envie um array JSON com os itens do lote.')
+        if len(corpo) > self.limite_itens:
+            abort(400, message=f'O lote aceita no máximo {self.limite_itens} itens.')
+        return corpo
+    
+    def validar(self, item):
+        # Valida o item com o parser do resource; devolve (args, None) ou (None, erro)
+        if not isinstance(item, dict):
+            return None, 'Item deve ser um objeto JSON.'
+        try:
+            return self.default_args.parse_args(req=RequisicaoItem(item)), None
+        except HTTPException as e:
+            return None, getattr(e, 'data', {}).get('message', str(e))
+    
+    @staticmethod
+    def id_valido(id_):
+        # bool é subclasse de int: sem essa checagem, true/false seriam tratados como os ids 1 e 0
+        return type(id_) is int
+    
+    def ids_existentes(self, ids):
+        tabela = self.model.__table__
+        return set(db.session.scalars(select(tabela.c.id).where(tabela.c.id.in_(ids))))
+    
+    def executar(self, resultados, validos, operacao, atomico):
+        """
+        Executa a operação (uma instrução por tipo de operação) em uma única transação e
+        monta a resposta. Sem ?atomico, os itens inválidos são só reportados e, se a instrução
+        em lote falhar no banco, os itens válidos são refeitos um a um para isolar os erros.
+        """
+        falhas = [r for r in resultados if r['status'] >= 400]
+        
+        if atomico and falhas:
+            return self.resposta(resultados, 'Lote cancelado: há itens inválidos.'), 400
+        
+        if validos:
+            try:
+                operacao(validos)
+                registrar_alteracao(self.model)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                if atomico:
+                    return {'message': 'Erro ao salvar lote no banco', 'error': str(e.__cause__ or e)}, 500
+                
+                for item in validos:
+                    try:
+                        operacao([item])
+                        registrar_alteracao(self.model)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        resultados[item['indice']] = {'indice': item['indice'], 'status': 500, 'erro': str(e.__cause__ or e)}
+        
+        return self.resposta(resultados), 200
+    
+    def resposta(self, resultados, mensagem=None):
+        sucessos = sum(1 for r in resultados if r['status'] < 400)
+        resposta = {'total': len(resultados), 'sucessos': sucessos, 'falhas': len(resultados) - sucessos, 'resultados': resultados}
+        if mensagem:
+            resposta['message'] = mensagem
+        return resposta
+    
+    # POST (criação em lote)
+    def post(self):
+        atomico = self.lote_args.parse_args()['atomico']
+        tabela = self.model.__table__
+        resultados, validos = [], []
+        
+        for indice, item in enumerate(self.ler_itens()):
+            args, erro = self.validar(item)
+            if erro:
+                resultados.append({'indice': indice, 'status': 400, 'erro': erro})
+            else:
+                # Como no POST individual (ORM), valores ausentes não anulam o default da coluna
+                valores = dict(args)
+                for coluna in tabela.c:
+                    if valores.get(coluna.name) is None and coluna.default is not None and coluna.default.is_scalar:
+                        valores[coluna.name] = coluna.default.arg
+                
+                resultados.append({'indice': indice, 'status': 201})
+                validos.append({'indice': indice, 'valores': valores})
+        
+        def inserir(itens):
+            valores = [i['valores'] for i in itens]
+            
+            # Um único INSERT em lote; com RETURNING (SQLite) os ids já voltam na mesma instrução
+            if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+                stmt = insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True)
+                ids = list(db.session.execute(stmt, valores).scalars())
+            else:
+                db.session.execute(insert(tabela), valores)
+                ids = [None] * len(itens)
+            
+            for item, id_ in zip(itens, ids):
+                resultados[item['indice']]['id'] = id_
+            
+            contabilizar(tabela, depois=valores)
+        
+        return self.executar(resultados, validos, inserir, atomico)
+    
+    # PATCH (atualização em lote; cada item precisa do id)
+    def patch(self):
+        atomico = self.lote_args.parse_args()['atomico']
+        tabela = self.model.__table__
+        itens = self.ler_itens()
+        resultados, validos = [], []
+        
+        ids = [i.get('id') for i in itens if isinstance(i, dict) and self.id_valido(i.get('id'))]
+        existentes = self.ids_existentes(ids)
+        
+        for indice, item in enumerate(itens):
+            args, erro = self.validar(item)
+            id_ = item.get('id') if isinstance(item, dict) else None
+            
+            if erro:
+                resultados.append({'indice': indice, 'id': id_, 'status': 400, 'erro': erro})
+            elif not self.id_valido(id_):
+                resultados.append({'indice': indice, 'id': id_, 'status': 400, 'erro': 'id inválido.'})
+            elif id_ not in existentes:
+                resultados.append({'indice': indice, 'id': id_, 'status': 404, 'erro': 'Tag não existe.'})
+            else:
+                resultados.append({'indice': indice, 'id': id_, 'status': 200})
+                
+                # Assim como no PATCH individual, só os valores enviados são atualizados
+                valores = {k: v for k, v in args.items() if v is not None}
+                validos.append({'indice': indice, 'id': id_, 'valores': valores})
+        
+        def atualizar(itens):
+            # Um UPDATE (executemany) por conjunto de colunas alteradas
+            grupos = {}
+            for item in itens:
+                grupos.setdefault(tuple(sorted(item['valores'])), []).append(item)
+            
+            with alterando(tabela, [i['id'] for i in itens]):
+                for colunas, grupo in grupos.items():
+                    stmt = update(tabela).where(tabela.c.id == bindparam('_id')).values({c: bindparam(f'_{c}') for c in colunas})
+                    db.session.execute(stmt, [{'_id': i['id'], **{f'_{c}': i['valores'][c] for c in colunas}} for i in grupo])
+        
+        return self.executar(resultados, validos, atualizar, atomico)
+    
+    # DELETE (remoção em lote; aceita ids ou objetos com id)
+    def delete(self):
+        atomico = self.lote_args.parse_args()['atomico']
+        tabela = self.model.__table__
+        itens = self.ler_itens()
+        resultados, validos = [], []
+        
+        ids = [i.get('id') if isinstance(i, dict) else i for i in itens]
+        existentes = self.ids_existentes([i for i in ids if self.id_valido(i)])
+        
+        for indice, id_ in enumerate(ids):
+            if not self.id_valido(id_):
+                resultados.append({'indice': indice, 'id': id_, 'status': 400, 'erro': 'id inválido.'})
+            elif id_ not in existentes:
+                resultados.append({'indice': indice, 'id': id_, 'status': 404, 'erro': 'Tag não existe.'})
+            else:
+                resultados.append({'indice': indice, 'id': id_, 'status': 204})
+                validos.append({'indice': indice, 'id': id_})
+        
+        def remover(itens):
+            ids = [i['id'] for i in itens]
+            with alterando(tabela, ids):
+                db.session.execute(delete(tabela).where(tabela.c.id.in_(ids)))
+        
+        return self.executar(resultados, validos, remover, atomico)
+
+# Resource que representa a exportação completa (em streaming) de um tipo de tag
+class DefaultsExportResource(Resource):
+    
+    # Atributos genéricos (serão alterados nas classes específicas)
+    default_fields = None
+    model = None
+    
+    export_args = reqparse.RequestParser()
+    export_args.add_argument('format', type=str, default='ndjson', choices=tuple(FORMATOS), location='args')
+    
+    # GET
+    def get(self):
+        formato = self.export_args.parse_args()['format']
+        
+        if formato == 'xlsx':
+            # Mesma aba e colunas do template de upload
+            aba = aba_do_model(self.model)
+            corpo = gerar_xlsx([(aba, CAMPOS[aba], self.model, self.default_fields)])
+        elif formato == 'csv':
+            corpo = gerar_csv(self.model, self.default_fields)
+        else:
+            corpo = gerar_ndjson(self.model, self.default_fields)
+        
+        return exportar(corpo, self.model.__tablename__, formato)
+
+# Resposta em streaming (o gerador roda dentro do contexto da requisição, com a sessão do banco)
+def exportar(corpo, nome, formato):
+    return Response(
+        stream_with_context(corpo),
+        content_type=FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename={nome}.{formato}'}
+    )
+
 # --- Resources específicos ---
 # Essa parte do código define de fato os resources concretos 
 # da API, com suas características e especificidades.
@@ -174,6 +561,14 @@ class Especialidade(DefaultResource):
     default_fields = especialidade_fields
     model = EspecialidadeModel
     default_args = especialidade_args
+
+class EspecialidadesBatch(DefaultsBatchResource):
+    model = EspecialidadeModel
+    default_args = especialidade_args
+
+class EspecialidadesExport(DefaultsExportResource):
+    default_fields = especialidade_fields
+    model = EspecialidadeModel
     
 # Resources responsável
 
@@ -204,6 +599,14 @@ class Responsavel(DefaultResource):
     default_fields = responsavel_fields
     model = ResponsavelModel
     default_args = responsavel_args
+
+class ResponsaveisBatch(DefaultsBatchResource):
+    model = ResponsavelModel
+    default_args = responsavel_args
+
+class ResponsaveisExport(DefaultsExportResource):
+    default_fields = responsavel_fields
+    model = ResponsavelModel
     
 # Resources médico
 
@@ -229,11 +632,21 @@ class Medicos(DefaultsResource):
     default_fields = medico_fields
     model = MedicoModel
     default_args = medico_args
+    relacionamentos = ('especialidade',)
     
 class Medico(DefaultResource):
     default_fields = medico_fields
     model = MedicoModel
     default_args = medico_args
+    relacionamentos = ('especialidade',)
+
+class MedicosBatch(DefaultsBatchResource):
+    model = MedicoModel
+    default_args = medico_args
+
+class MedicosExport(DefaultsExportResource):
+    default_fields = medico_fields
+    model = MedicoModel
     
 # Resources cirurgia
 
@@ -255,11 +668,21 @@ class Cirurgias(DefaultsResource):
     default_fields = cirurgia_fields
     model = CirurgiaModel
     default_args = cirurgia_args
+    relacionamentos = ('especialidade',)
     
 class Cirurgia(DefaultResource):
     default_fields = cirurgia_fields
     model = CirurgiaModel
     default_args = cirurgia_args
+    relacionamentos = ('especialidade',)
+
+class CirurgiasBatch(DefaultsBatchResource):
+    model = CirurgiaModel
+    default_args = cirurgia_args
+
+class CirurgiasExport(DefaultsExportResource):
+    default_fields = cirurgia_fields
+    model = CirurgiaModel
     
 # Resources plano
 
@@ -289,45 +712,212 @@ class Plano(DefaultResource):
     model = PlanoModel
     default_args = plano_args
 
+class PlanosBatch(DefaultsBatchResource):
+    model = PlanoModel
+    default_args = plano_args
+
+class PlanosExport(DefaultsExportResource):
+    default_fields = plano_fields
+    model = PlanoModel
+
 # upload em massa
 class UploadDados(Resource):
+    
+    # Argumentos do upload
+    upload_args = reqparse.RequestParser()
+    upload_args.add_argument('modo', type=str, default='inserir', choices=MODOS, location='args')
+    upload_args.add_argument('criar_especialidades', type=inputs.boolean, default=False, location='args')
+    upload_args.add_argument('paralelo', type=inputs.boolean, default=False, location='args')
+    # Modo incremental: desativa as linhas que sumiram da planilha / só calcula o resumo, sem gravar
+    upload_args.add_argument('desativar_ausentes', type=inputs.boolean, default=False, location='args')
+    upload_args.add_argument('simular', type=inputs.boolean, default=False, location='args')
+    # Valida a planilha inteira antes de gravar e não grava nada se houver linhas inválidas
+    upload_args.add_argument('abortar_invalidos', type=inputs.boolean, default=False, location='args')
+
+    # Extensões aceitas; o conteúdo também precisa ser um zip (assinatura PK\x03\x04)
+    EXTENSOES = ('.xlsx', '.xlsm')
+    ASSINATURA = b'PK\x03\x04'
+
     def post(self):
-        # 1. Verifica se o arquivo foi enviado na requisição
+        # 1. Rejeita uploads grandes demais pelo Content-Length, antes de ler o corpo
+        if request.content_length is not None and request.content_length > TAMANHO_MAXIMO:
+            return {'message': f'Arquivo maior que o limite de {TAMANHO_MAXIMO // MB} MB.'}, 413
+        
+        args = self.upload_args.parse_args()
+        if (args['desativar_ausentes'] or args['simular']) and args['modo'] != 'incremental':
+            return {'message': 'desativar_ausentes e simular só valem com modo=incremental.'}, 400
+
+        # 2. Verifica se o arquivo foi enviado na requisição
         if 'file' not in request.files:
             return {'message': 'Nenhum arquivo enviado.'}, 400
             
         file = request.files['file']
         
-        # 2. Verifica se o nome do arquivo é vazio
+        # 3. Verifica se o nome do arquivo é vazio
         if file.filename == '':
             return {'message': 'Nenhum arquivo selecionado.'}, 400
+        
+        # 4. Confere extensão e assinatura antes de enfileirar (evita jobs que só falhariam na leitura)
+        if not secure_filename(file.filename).lower().endswith(self.EXTENSOES):
+            return {'message': 'Envie uma planilha .xlsx.'}, 400
+        if file.stream.read(len(self.ASSINATURA)) != self.ASSINATURA:
+            return {'message': 'O arquivo enviado não é uma planilha .xlsx válida.'}, 400
+        file.stream.seek(0)
             
-        if file:
-            # 3. Garante que o nome do arquivo é seguro (remove caracteres perigosos)
-            filename = secure_filename(file.filename)
+        try:
+            # 5. Registra o job e guarda o conteúdo: em memória (uploads pequenos) ou num
+            # arquivo temporário com nome único (evita que uploads simultâneos se sobrescrevam)
+            opcoes = {
+                'criar_referencias': args['criar_especialidades'],
+                'paralelo': args['paralelo'],
+                'abortar_invalidos': args['abortar_invalidos']
+            }
+            if args['modo'] == 'incremental':
+                opcoes.update({'desativar_ausentes': args['desativar_ausentes'], 'simular': args['simular']})
+            job = criar_job(None, args['modo'], opcoes)
+            guardar_upload(job, file.stream)
+            db.session.commit()
             
-            # Cria pasta de uploads se não existir
-            upload_folder = os.path.join(os.getcwd(), 'uploads')
-            if not os.path.exists(upload_folder):
-                os.makedirs(upload_folder)
-                
-            filepath = os.path.join(upload_folder, filename)
+            # 6. Envia o job para a fila de processamento em segundo plano
+            enfileirar(current_app._get_current_object(), job.id)
             
-            try:
-                # 4. Salva o arquivo temporariamente
-                file.save(filepath)
-                
-                # 5. Instancia e executa o processador
-                processador = ProcessadorExcel()
-                processador.executar(filepath)
-                
-                # 6. Remove o arquivo após o processamento (Limpeza)
-                os.remove(filepath)
-                
-                return {'message': 'Processamento de dados concluído com sucesso!'}, 201
-                
-            except Exception as e:
-                # Se der erro, tenta remover o arquivo mesmo assim para não acumular lixo
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                return {'message': 'Erro ao processar planilha.', 'error': str(e)}, 500
\ No newline at end of file
+            return {
+                'message': 'Planilha recebida. Processamento em andamento.',
+                'job_id': job.id,
+                'status': job.status
+            }, 202
+            
+        except Exception as e:
+            db.session.rollback()
+            return {'message': 'Erro ao receber planilha.', 'error': str(e)}, 500
+
+
+# Exportação de todas as tabelas em uma planilha no layout do template de upload
+class ExportarPlanilha(Resource):
+    
+    # GET
+    def get(self):
+        campos_por_model = {cls.model: cls.default_fields for cls in DefaultsExportResource.__subclasses__()}
+        
+        abas = [
+            (aba, CAMPOS[aba], Modelo, campos_por_model[Modelo])
+            for aba, Modelo in MAPA_TABELAS.items()
+        ]
+        return exportar(gerar_xlsx(abas), 'tags', 'xlsx')
+
+
+# Codificação da resposta entre as representações já comprimidas, pelo Accept-Encoding
+# (br antes de gzip em caso de empate; sem cabeçalho, sem compressão)
+def negociar_codificacao(representacoes):
+    aceitas = request.accept_encodings
+    opcoes = [c for c in ('br', 'gzip') if c in representacoes and aceitas[c] > 0]
+    return max(opcoes, key=lambda c: aceitas[c], default='identity')
+
+
+# Pares id/nome das tags ativas de todas as tabelas, servidos do snapshot em memória (ver lookup.py)
+class Lookup(Resource):
+    
+    lookup_args = reqparse.RequestParser()
+    lookup_args.add_argument('since', type=str, location='args')
+    
+    # GET
+    def get(self):
+        since = self.lookup_args.parse_args()['since']
+        try:
+            versao, representacoes = snapshot_lookup.delta(since) if since else snapshot_lookup.atual()
+        except ValueError as e:
+            abort(400, message=str(e))
+        
+        # ETag fraca: o mesmo conteúdo vale para todas as codificações
+        etag = f'{since}-{versao}' if since else versao
+        cabecalhos = {'ETag': f'W/"{etag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=cabecalhos)
+        
+        codificacao = negociar_codificacao(representacoes)
+        if codificacao != 'identity':
+            cabecalhos['Content-Encoding'] = codificacao
+        return Response(representacoes[codificacao], mimetype='application/json', headers=cabecalhos)
+
+
+# Agregados das tags lidos dos resumos (ver resumos.py), com ETag pelas versões das tabelas
+class DefaultsStatsResource(Resource):
+    
+    # Atributos genéricos (serão alterados nas classes específicas): chave da resposta e
+    # função de resumos.py que monta o conteúdo
+    chave = None
+    agregacao = None
+    
+    # GET
+    def get(self):
+        versoes_tabelas = versoes(TABELAS.values())
+        chave = chave_resposta(type(self).__name__, {}, versoes_tabelas)
+        
+        cabecalhos, nao_modificado = validar_condicional(chave, versoes_tabelas)
+        if nao_modificado:
+            return nao_modificado
+        
+        return {self.chave: self.agregacao()}, 200, cabecalhos
+
+# Registros, ativos e pacientes de cada tabela
+class Estatisticas(DefaultsStatsResource):
+    chave = 'tabelas'
+    agregacao = staticmethod(totais)
+
+# Médicos, cirurgias e pacientes por especialidade
+class EstatisticasEspecialidades(DefaultsStatsResource):
+    chave = 'especialidades'
+    agregacao = staticmethod(por_especialidade)
+
+
+# Contadores do cache de respostas
+class CacheStatus(Resource):
+    
+    # GET
+    def get(self):
+        return cache_respostas.estatisticas()
+
+
+# Estado do pool de conexões (principal e réplica)
+class PoolStatus(Resource):
+    
+    # GET
+    def get(self):
+        return estatisticas_pool(db.engines)
+
+
+# Métricas no formato texto do Prometheus
+class Metricas(Resource):
+    
+    # GET
+    def get(self):
+        return Response(registro.texto(), mimetype='text/plain; version=0.0.4')
+
+
+# Fields do job de upload
+upload_job_fields = {
+    'id': fields.String,
+    'status': fields.String,
+    'modo': fields.String,
+    'opcoes': fields.Raw,
+    'resultado': fields.Raw,
+    'erro': fields.String,
+    'criado_em': fields.DateTime(dt_format='iso8601'),
+    'iniciado_em': fields.DateTime(dt_format='iso8601'),
+    'atualizado_em': fields.DateTime(dt_format='iso8601'),
+    'finalizado_em': fields.DateTime(dt_format='iso8601')
+}
+
+# Status de um upload, selecionado pelo id do job
+class UploadStatus(Resource):
+    
+    # GET
+    def get(self, job_id):
+        
+        # Busca pelo job com o id passado na rota.
+        job = db.session.get(UploadJobModel, job_id)
+        
+        # Tratamento caso o job não exista no DB
+        if not job: abort(404, message='Job de upload não existe.')
+        
+        return marshal(job, upload_job_fields)
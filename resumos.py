@@ -0,0 +1,259 @@
+from datetime import datetime
+from contextlib import contextmanager
+
+from sqlalchemy import select, insert, update, delete, func, case, literal, bindparam
+from sqlalchemy.dialects import sqlite, mysql
+
+from models import db, ResumoContagemModel, EspecialidadeModel
+from lookup import TABELAS
+from impressoes import invalidar_impressoes
+
+# --- Resumos das tabelas de tags ---
+# Contadores agregados (registros, ativos e soma de pacientes) por tabela e por FK
+# (ex.: médicos por especialidade), lidos pelos endpoints /api/stats sem varrer as tabelas.
+# CRUD, lotes e a importação de planilhas aplicam a diferença das linhas alteradas na mesma
+# transação da escrita; o recalcular (GROUP BY) fica para FKs anuladas. As linhas anteriores à
+# tabela resumo_contagem foram resumidas pela migração que a criou.
+
+# Grupo dos totais da tabela e chave das linhas sem FK (e dos totais)
+TOTAL = ''
+SEM_GRUPO = 0
+
+CAMPOS = ('registros', 'ativos', 'pacientes', 'pacientes_ativos')
+
+
+def _tabela(tabela):
+    if isinstance(tabela, str):
+        return db.metadata.tables[tabela]
+    return getattr(tabela, '__table__', tabela)
+
+
+def _valor(linha, coluna):
+    # Linhas podem ser dicts (lotes, leituras com Core) ou objetos do ORM
+    return linha.get(coluna) if isinstance(linha, dict) else getattr(linha, coluna, None)
+
+
+def grupos(tabela):
+    """
+    Colunas de FK da tabela, cada uma vira um grupo do resumo (ex.: medico.id_especialidade).
+    """
+    return sorted(fk.parent.name for fk in _tabela(tabela).foreign_keys)
+
+
+def contribuicoes(tabela, linha, colunas_grupo=None):
+    """
+    Retorna {(grupo, chave): (registros, ativos, pacientes, pacientes_ativos)} de uma linha.
+    Como na importação, ativo nulo conta como ativo. colunas_grupo evita recalcular grupos(tabela)
+    a cada linha.
+    """
+    ativo = _valor(linha, 'ativo') is not False
+    pacientes = (_valor(linha, 'pacientes') or 0) if 'pacientes' in tabela.c else 0
+    valores = (1, int(ativo), pacientes, pacientes if ativo else 0)
+
+    colunas_grupo = grupos(tabela) if colunas_grupo is None else colunas_grupo
+    chaves = [(TOTAL, SEM_GRUPO)] + [(g, _valor(linha, g) or SEM_GRUPO) for g in colunas_grupo]
+    return {chave: valores for chave in chaves}
+
+
+def contabilizar(tabela, antes=(), depois=()):
+    """
+    Aplica nos resumos a diferença entre as linhas antes e depois de uma escrita, na transação
+    atual (o commit fica por conta de quem chamou). No SQLite e no MySQL é um único INSERT ...
+    ON CONFLICT / ON DUPLICATE KEY UPDATE (executemany) que soma a diferença, qualquer que seja
+    a quantidade de linhas e de chaves; chaves novas criadas ao mesmo tempo por duas escritas
+    não colidem.
+    """
+    tabela = _tabela(tabela)
+    colunas_grupo = grupos(tabela)
+    deltas = {}
+    for sinal, linhas in ((-1, antes), (1, depois)):
+        for linha in linhas:
+            for chave, valores in contribuicoes(tabela, linha, colunas_grupo).items():
+                soma = deltas.setdefault(chave, [0] * len(CAMPOS))
+                for i, valor in enumerate(valores):
+                    soma[i] += sinal * valor
+
+    deltas = {chave: valores for chave, valores in deltas.items() if any(valores)}
+    if not deltas:
+        return
+
+    resumo = ResumoContagemModel.__table__
+    agora = datetime.utcnow()
+    linhas = [
+        {'tabela': tabela.name, 'grupo': g, 'chave': c, 'atualizado_em': agora, **dict(zip(CAMPOS, valores))}
+        for (g, c), valores in deltas.items()
+    ]
+    dialeto = db.session.get_bind().dialect.name
+
+    if dialeto == 'sqlite':
+        stmt = sqlite.insert(resumo)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[resumo.c.tabela, resumo.c.grupo, resumo.c.chave],
+            set_={**{campo: resumo.c[campo] + stmt.excluded[campo] for campo in CAMPOS}, 'atualizado_em': stmt.excluded.atualizado_em}
+        )
+        db.session.execute(stmt, linhas)
+        return
+    if dialeto == 'mysql':
+        stmt = mysql.insert(resumo)
+        stmt = stmt.on_duplicate_key_update({
+            **{campo: resumo.c[campo] + stmt.inserted[campo] for campo in CAMPOS}, 'atualizado_em': stmt.inserted.atualizado_em
+        })
+        db.session.execute(stmt, linhas)
+        return
+
+    # Demais bancos: chaves que já têm linha no resumo recebem a diferença; as demais são inseridas
+    existentes = set()
+    for grupo in {g for g, _ in deltas}:
+        chaves = [c for g, c in deltas if g == grupo]
+        existentes.update((grupo, c) for c in db.session.scalars(
+            select(resumo.c.chave).where(resumo.c.tabela == tabela.name, resumo.c.grupo == grupo, resumo.c.chave.in_(chaves))
+        ))
+
+    somar = [
+        {'_grupo': g, '_chave': c, **{f'_{campo}': v for campo, v in zip(CAMPOS, valores)}}
+        for (g, c), valores in deltas.items() if (g, c) in existentes
+    ]
+    if somar:
+        stmt = (
+            update(resumo)
+            .where(resumo.c.tabela == tabela.name, resumo.c.grupo == bindparam('_grupo'), resumo.c.chave == bindparam('_chave'))
+            .values({**{campo: resumo.c[campo] + bindparam(f'_{campo}') for campo in CAMPOS}, 'atualizado_em': agora})
+        )
+        db.session.execute(stmt, somar)
+
+    novos = [l for l in linhas if (l['grupo'], l['chave']) not in existentes]
+    if novos:
+        db.session.execute(insert(resumo), novos)
+
+
+def estados(tabela, ids):
+    """
+    Colunas que entram nos resumos (ativo, pacientes e FKs) das linhas com os ids informados.
+    """
+    tabela = _tabela(tabela)
+    colunas = [tabela.c.id, tabela.c.ativo] + [tabela.c[c] for c in ('pacientes', *grupos(tabela)) if c in tabela.c]
+    return [dict(l._mapping) for l in db.session.execute(select(*colunas).where(tabela.c.id.in_(ids)))]
+
+
+@contextmanager
+def alterando(tabela, ids):
+    """
+    Envolve a alteração ou remoção das linhas com os ids informados, contabilizando nos resumos
+    a diferença entre antes e depois do bloco. As impressões do modo incremental dessas linhas
+    (com o nome de antes e o de depois) são invalidadas.
+    """
+    tabela = _tabela(tabela)
+    if not ids:
+        yield
+        return
+    
+    antes = estados(tabela, ids)
+    invalidar_impressoes(tabela, tabela.c.id.in_(ids))
+    yield
+
+    # Leva para o banco o que o ORM ainda não gravou antes de reler as linhas
+    db.session.flush()
+    depois = estados(tabela, ids)
+    contabilizar(tabela, antes, depois)
+    if depois:
+        invalidar_impressoes(tabela, tabela.c.id.in_(ids))
+
+    # Linhas removidas podem ter anulado FKs em outras tabelas (ON DELETE SET NULL): os resumos
+    # dessas chaves são refeitos e as impressões das linhas sem FK invalidadas
+    removidos = {l['id'] for l in antes} - {l['id'] for l in depois}
+    if removidos:
+        for Model in TABELAS.values():
+            for fk in Model.__table__.foreign_keys:
+                if fk.column.table is tabela:
+                    recalcular(Model, grupo=fk.parent.name, chaves=removidos | {SEM_GRUPO})
+                    invalidar_impressoes(Model.__table__, fk.parent.is_(None))
+
+
+def _consulta_agrupada(tabela, grupo, filtro=None):
+    ativo = db.or_(tabela.c.ativo.is_(None), tabela.c.ativo == True)
+    pacientes = func.coalesce(tabela.c.pacientes, 0) if 'pacientes' in tabela.c else literal(0)
+    chave = func.coalesce(tabela.c[grupo], SEM_GRUPO) if grupo else literal(SEM_GRUPO)
+
+    consulta = select(
+        literal(tabela.name), literal(grupo), chave,
+        func.count(),
+        func.coalesce(func.sum(case((ativo, 1), else_=0)), 0),
+        func.coalesce(func.sum(pacientes), 0),
+        func.coalesce(func.sum(case((ativo, pacientes), else_=0)), 0),
+        literal(datetime.utcnow())
+    ).select_from(tabela).group_by(chave)
+
+    return consulta.where(filtro) if filtro is not None else consulta
+
+
+def recalcular(*tabelas, grupo=None, chaves=None):
+    """
+    Refaz os resumos das tabelas (todas as de tags, se nenhuma for informada) com GROUP BY.
+    Com grupo e chaves, refaz só essas chaves daquele grupo. O commit fica por conta de quem chamou.
+    """
+    colunas = ['tabela', 'grupo', 'chave', *CAMPOS, 'atualizado_em']
+
+    for tabela in [_tabela(t) for t in tabelas or TABELAS.values()]:
+        apagar = delete(ResumoContagemModel).where(ResumoContagemModel.tabela == tabela.name)
+
+        if grupo is None:
+            db.session.execute(apagar)
+            for g in [TOTAL, *grupos(tabela)]:
+                db.session.execute(insert(ResumoContagemModel).from_select(colunas, _consulta_agrupada(tabela, g)))
+            continue
+
+        ids = [c for c in chaves if c != SEM_GRUPO]
+        filtro = tabela.c[grupo].in_(ids)
+        if SEM_GRUPO in chaves:
+            filtro = db.or_(filtro, tabela.c[grupo].is_(None))
+
+        db.session.execute(apagar.where(ResumoContagemModel.grupo == grupo, ResumoContagemModel.chave.in_(chaves)))
+        db.session.execute(insert(ResumoContagemModel).from_select(colunas, _consulta_agrupada(tabela, grupo, filtro)))
+
+
+def _contagens(linha, pacientes=True):
+    campos = CAMPOS if pacientes else CAMPOS[:2]
+    return {c: getattr(linha, c, 0) if linha is not None else 0 for c in campos}
+
+
+def totais():
+    """
+    Totais de cada tabela de tags (com soma de pacientes nas que têm a coluna).
+    """
+    linhas = {
+        l.tabela: l for l in db.session.execute(
+            select(ResumoContagemModel).where(ResumoContagemModel.grupo == TOTAL)
+        ).scalars()
+    }
+    return {
+        nome: _contagens(linhas.get(Model.__tablename__), 'pacientes' in Model.__table__.c)
+        for nome, Model in TABELAS.items()
+    }
+
+
+def por_especialidade():
+    """
+    Médicos e cirurgias (com pacientes dos médicos) por especialidade, somando os grupos
+    id_especialidade das tabelas que têm essa FK. Linhas sem especialidade ficam com id None.
+    """
+    Resumo = ResumoContagemModel
+    consulta = (
+        select(Resumo.tabela, Resumo.chave, EspecialidadeModel.nome, *[func.sum(getattr(Resumo, c)).label(c) for c in CAMPOS])
+        .outerjoin(EspecialidadeModel, EspecialidadeModel.id == Resumo.chave)
+        .where(Resumo.grupo == 'id_especialidade', Resumo.registros > 0)
+        .group_by(Resumo.tabela, Resumo.chave, EspecialidadeModel.nome)
+        .order_by(Resumo.chave)
+    )
+
+    nomes = {Model.__tablename__: nome for nome, Model in TABELAS.items()}
+    tabelas = sorted(nome for nome, Model in TABELAS.items() if 'id_especialidade' in Model.__table__.c)
+    especialidades = {}
+    for linha in db.session.execute(consulta):
+        nome = nomes[linha.tabela]
+        especialidade = especialidades.setdefault(linha.chave, {
+            'id': linha.chave or None,
+            'nome': linha.nome,
+            **{t: _contagens(None, 'pacientes' in TABELAS[t].__table__.c) for t in tabelas}
+        })
+        especialidade[nome] = _contagens(linha, 'pacientes' in TABELAS[nome].__table__.c)
+    return list(especialidades.values())
@@ -0,0 +1,90 @@
+from flask_restful import fields
+
+from models import db
+
+# --- Serialização compilada ---
+# O marshal() do flask_restful percorre os fields item a item, resolvendo atributos por
+# reflexão a cada valor. Aqui os *_fields de cada resource são "compilados" uma única vez
+# em uma lista de colunas + conversores: a consulta traz só essas colunas (tuplas, sem
+# instanciar objetos ORM) e cada linha vira um dict com o mesmo conteúdo e a mesma ordem
+# de chaves que o marshal produziria, gerando exatamente o mesmo JSON.
+
+
+def _conversor(field):
+    """
+    Reproduz o format/default do field do flask_restful para um valor vindo do banco.
+    """
+    default = field.default
+
+    if isinstance(field, fields.Integer):
+        return lambda v: default if v is None else int(v)
+    if isinstance(field, fields.Boolean):
+        return lambda v: default if v is None else bool(v)
+    if isinstance(field, fields.String):
+        return lambda v: default if v is None else str(v)
+    if type(field) is fields.Raw:
+        return lambda v: default if v is None else v
+
+    raise TypeError(f'Field {type(field).__name__} não suportado pela serialização compilada.')
+
+
+class Serializador:
+
+    def __init__(self, model, campos):
+        self.model = model
+        self.chaves = []
+        self.colunas = []
+        self.conversores = []
+        self.joins = []
+
+        for chave, field in campos.items():
+            if isinstance(field, type):
+                field = field()
+
+            # attribute='especialidade.nome' -> coluna nome da tabela do relacionamento especialidade
+            caminho = (field.attribute or chave).split('.')
+            if len(caminho) == 1:
+                coluna = model.__table__.c[caminho[0]]
+            elif len(caminho) == 2:
+                relacionamento = getattr(model, caminho[0])
+                alvo = relacionamento.property.mapper.class_
+                coluna = getattr(alvo, caminho[1])
+                if relacionamento not in self.joins:
+                    self.joins.append(relacionamento)
+            else:
+                raise TypeError(f'Atributo {field.attribute} não suportado pela serialização compilada.')
+
+            self.chaves.append(chave)
+            self.colunas.append(coluna.label(chave))
+            self.conversores.append(_conversor(field))
+
+        self._pares = list(zip(self.chaves, self.conversores))
+
+    def consulta(self):
+        """
+        Query que retorna apenas as colunas dos fields (LEFT JOIN nos relacionamentos).
+        """
+        query = db.session.query(*self.colunas).select_from(self.model)
+        for relacionamento in self.joins:
+            query = query.outerjoin(relacionamento)
+        return query
+
+    def linha(self, row):
+        return {chave: conversor(valor) for (chave, conversor), valor in zip(self._pares, row)}
+
+    def linhas(self, rows):
+        linha = self.linha
+        return [linha(row) for row in rows]
+
+
+_compilados = {}
+
+
+def serializador(model, campos):
+    """
+    Retorna o serializador compilado para o par (model, fields), criando-o na primeira chamada.
+    """
+    chave = (model, id(campos))
+    if chave not in _compilados:
+        _compilados[chave] = Serializador(model, campos)
+    return _compilados[chave]
@@ -0,0 +1,32 @@
+"""
+Fixtures compartilhadas pelos testes: app Flask com as rotas das tags sobre um banco criado
+pelas migrações (o mesmo criar_app dos benchmarks).
+
+Uso: python -m pytest
+     TESTE_DB_URI=mysql+pymysql://... python -m pytest
+"""
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+
+from comum import criar_app  # noqa: E402
+from cache import cache_respostas  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # O cache de respostas é do processo e cada teste tem um banco novo (com as mesmas versões
+    # das tabelas): sem desligá-lo, um teste receberia as respostas guardadas pelo anterior
+    monkeypatch.setattr(cache_respostas, 'habilitado', False)
+    
+    # Banco em memória por padrão; com TESTE_DB_URI o banco informado precisa estar vazio
+    return criar_app(os.getenv('TESTE_DB_URI', 'sqlite://'))
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
@@ -0,0 +1,33 @@
+"""
+Parâmetro ?search= das listagens (índice FTS5 no SQLite).
+"""
+import pytest
+from sqlalchemy import insert
+
+from models import db, MedicoModel
+
+
+@pytest.fixture
+def povoado(app):
+    with app.app_context():
+        db.session.execute(insert(MedicoModel), [
+            {'nome': 'ana paula'}, {'nome': 'joão cardoso'}, {'nome': 'josé carlos'}
+        ])
+        db.session.commit()
+    return app
+
+
+def nomes(cliente, busca):
+    resposta = cliente.get('/api/medicos', query_string={'search': busca})
+    assert resposta.status_code == 200
+    return sorted(item['nome'] for item in resposta.get_json()['itens'])
+
+
+def test_busca_por_prefixo_ignorando_acentos(povoado, cliente):
+    assert nomes(cliente, 'car') == sorted(['joão cardoso', 'josé carlos'])
+    assert nomes(cliente, 'Jose') == ['josé carlos']
+
+
+@pytest.mark.parametrize('busca', ['%', '"', '-', '  '])
+def test_busca_sem_palavras_nao_retorna_a_tabela_inteira(povoado, cliente, busca):
+    assert nomes(cliente, busca) == []
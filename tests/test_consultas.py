@@ -0,0 +1,63 @@
+"""
+Quantidade de consultas SQL das listagens com relacionamentos: uma página custa o mesmo número
+de consultas qualquer que seja o per_page (sem N+1 por especialidade), tanto com o serializador
+compilado (JOIN nas tuplas) quanto no marshal sobre objetos ORM (eager loading).
+"""
+import pytest
+from sqlalchemy import event, insert
+
+from models import db, EspecialidadeModel, MedicoModel, CirurgiaModel
+from resources import Medicos, Cirurgias
+
+LINHAS = 30
+
+RECURSOS = {'medicos': Medicos, 'cirurgias': Cirurgias}
+
+
+@pytest.fixture
+def povoado(app):
+    # Cada médico/cirurgia aponta para uma especialidade diferente: um lazy load por linha
+    # apareceria como uma consulta a mais por item da página
+    with app.app_context():
+        db.session.execute(insert(EspecialidadeModel), [{'nome': f'especialidade {i}'} for i in range(LINHAS)])
+        db.session.execute(insert(MedicoModel), [
+            {'nome': f'medico {i}', 'tipo': 'Cirurgião', 'id_especialidade': i + 1} for i in range(LINHAS)
+        ])
+        db.session.execute(insert(CirurgiaModel), [
+            {'nome': f'cirurgia {i}', 'id_especialidade': i + 1} for i in range(LINHAS)
+        ])
+        db.session.commit()
+    return app
+
+
+def consultas(app, cliente, url):
+    contagem = []
+
+    def contar(conn, cursor, instrucao, parametros, context, executemany):
+        contagem.append(instrucao)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            resposta = cliente.get(url)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+
+    assert resposta.status_code == 200
+    return len(contagem), resposta.get_json()
+
+
+@pytest.mark.parametrize('compilado', [True, False], ids=['compilado', 'orm'])
+@pytest.mark.parametrize('recurso', RECURSOS)
+def test_consultas_por_pagina_nao_dependem_do_per_page(povoado, cliente, monkeypatch, recurso, compilado):
+    if not compilado:
+        # Sem serializador compilado a listagem usa a query ORM com joinedload
+        monkeypatch.setattr(RECURSOS[recurso], 'serializador', classmethod(lambda cls: None))
+
+    pequena, dados_pequena = consultas(povoado, cliente, f'/api/{recurso}?per_page=5')
+    grande, dados_grande = consultas(povoado, cliente, f'/api/{recurso}?per_page=25')
+
+    assert len(dados_pequena['itens']) == 5
+    assert len(dados_grande['itens']) == 25
+    assert dados_grande['itens'][-1]['especialidade'] == 'especialidade 24'
+    assert pequena == grande
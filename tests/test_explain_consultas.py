@@ -0,0 +1,87 @@
+"""
+Planos de execução das consultas quentes da API.
+
+Importa o template de upload (inserção e upsert), faz as requisições mais comuns de
+listagem/detalhe/busca e roda EXPLAIN em cada SELECT com WHERE que foi executado. Falha se
+alguma delas varrer uma tabela inteira em vez de usar um índice.
+"""
+import re
+
+from sqlalchemy import event, select
+
+from comum import TEMPLATE, ROTAS
+from models import db, MedicoModel, CirurgiaModel
+from processador_planilha import ProcessadorExcel
+
+# Tabelas que não podem ser varridas por inteiro em consultas filtradas
+TABELAS = {'especialidade', 'medico', 'cirurgia', 'responsavel', 'plano', 'versao_tabela'}
+
+# Consultas feitas fora das rotas de listagem: filhos de uma especialidade
+# (ON DELETE SET NULL e contagens por especialidade)
+CONSULTAS_DIRETAS = [
+    select(MedicoModel.id).where(MedicoModel.id_especialidade == 1),
+    select(CirurgiaModel.id).where(CirurgiaModel.id_especialidade == 1)
+]
+
+
+def requisicoes(cliente):
+    for nome in ROTAS:
+        cliente.get(f'/api/{nome}?ativo=true')
+        cliente.get(f'/api/{nome}?ativo=false&count=false')
+        cliente.get(f'/api/{nome}/1')
+        cliente.get(f'/api/{nome}?search=ca')
+
+        # Paginação por cursor: primeira página e a seguinte
+        resposta = cliente.get(f'/api/{nome}?ativo=true&limit=2').get_json()
+        if resposta.get('proximo_cursor'):
+            cliente.get(f"/api/{nome}?ativo=true&limit=2&cursor={resposta['proximo_cursor']}")
+
+
+def varreduras(conexao, instrucao, parametros):
+    """
+    Retorna as tabelas de TABELAS que o plano da consulta lê por inteiro.
+    """
+    if conexao.dialect.name == 'sqlite':
+        plano = conexao.exec_driver_sql('EXPLAIN QUERY PLAN ' + instrucao, parametros).all()
+        # "SCAN medico" é varredura completa; "SCAN medico USING INDEX ..." e "SEARCH ..." usam índice
+        detalhes = [re.fullmatch(r'SCAN (?:TABLE )?(\w+)', linha.detail) for linha in plano]
+        return [d.group(1) for d in detalhes if d and d.group(1) in TABELAS]
+
+    plano = conexao.exec_driver_sql('EXPLAIN ' + instrucao, parametros).mappings().all()
+    return [linha['table'] for linha in plano if linha['type'] == 'ALL' and linha['table'] in TABELAS]
+
+
+def test_consultas_filtradas_usam_indices(app, cliente):
+    capturadas = []
+
+    with app.app_context():
+        def capturar(conn, cursor, instrucao, parametros, context, executemany):
+            if not executemany and instrucao.lstrip().upper().startswith('SELECT') and 'WHERE' in instrucao:
+                capturadas.append((instrucao, parametros))
+
+        event.listen(db.engine, 'before_cursor_execute', capturar)
+        try:
+            ProcessadorExcel().executar(TEMPLATE)
+            ProcessadorExcel(modo='upsert').executar(TEMPLATE)
+
+            requisicoes(cliente)
+
+            for consulta in CONSULTAS_DIRETAS:
+                db.session.execute(consulta).all()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capturar)
+
+        falhas = []
+        vistas = set()
+        with db.engine.connect() as conexao:
+            for instrucao, parametros in capturadas:
+                if instrucao in vistas:
+                    continue
+                vistas.add(instrucao)
+
+                tabelas = varreduras(conexao, instrucao, parametros)
+                if tabelas:
+                    falhas.append(f"Varredura em {', '.join(tabelas)}: {' '.join(instrucao.split())}")
+
+    assert vistas, "Nenhuma consulta filtrada foi capturada."
+    assert not falhas, '\n'.join(falhas)
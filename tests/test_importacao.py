@@ -0,0 +1,158 @@
+"""
+Importação da planilha (ProcessadorExcel) e resolução das chaves estrangeiras.
+"""
+import openpyxl
+import pandas as pd
+import pytest
+from sqlalchemy import insert, select
+
+from layout_planilha import CAMPOS
+from models import db, EspecialidadeModel, MedicoModel
+from processador_planilha import ProcessadorExcel, ResolvedorFK
+
+
+def test_nao_resolvidos_agrupados_pelo_valor_normalizado(app):
+    with app.app_context():
+        db.session.execute(insert(EspecialidadeModel), [{'nome': 'Cardiologia'}])
+        db.session.commit()
+
+        valores = pd.Series(['cardiologia', 'Pediatria', ' pediatria', 'PEDIATRIA ', None, ''])
+        ids, nao_resolvidos = ResolvedorFK(EspecialidadeModel).resolver(valores)
+
+    assert ids.tolist() == [1, None, None, None, None, None]
+    # Uma entrada por valor normalizado, com a primeira grafia como exemplo
+    assert nao_resolvidos == {'pediatria': ('Pediatria', 3)}
+
+
+def planilha(tmp_path, aba, linhas):
+    """
+    Grava uma planilha só com a aba informada: título, cabeçalho (layout_planilha.CAMPOS) e
+    as linhas, a partir da linha 3.
+    """
+    workbook = openpyxl.Workbook()
+    planilha = workbook.active
+    planilha.title = aba
+    planilha.append([aba])
+    planilha.append(CAMPOS[aba])
+    for linha in linhas:
+        planilha.append(linha)
+    caminho = tmp_path / 'planilha.xlsx'
+    workbook.save(caminho)
+    return caminho
+
+
+def test_repetido_so_conta_a_partir_da_primeira_ocorrencia_valida(tmp_path):
+    caminho = planilha(tmp_path, 'Responsáveis', [
+        ['Ana', 'email-invalido', None],   # linha 3: recusada pelo email
+        ['Ana', 'ana@exemplo.com', None],  # linha 4: 1ª ocorrência válida
+        ['Bia', 'bia@exemplo.com', None],  # linha 5
+        ['Ana', 'ana@exemplo.com', None],  # linha 6: repete a linha 4 (em outro lote)
+        ['Bia', 'bia@exemplo.com', None]   # linha 7: repete a linha 5 (no mesmo lote)
+    ])
+
+    relatorio = ProcessadorExcel(tamanho_lote=3).validar(caminho)['Responsáveis']
+
+    assert [(r['linha'], r['erro']) for r in relatorio] == [
+        (3, 'email: formato inválido'),
+        (6, 'nome: repetido na planilha (1ª ocorrência na linha 4)'),
+        (7, 'nome: repetido na planilha (1ª ocorrência na linha 5)')
+    ]
+
+
+def test_modo_paralelo_grava_todos_os_lotes(app, tmp_path):
+    caminho = tmp_path / 'planilha.xlsx'
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for aba, linhas in {
+        'Especialidades': [[f'Especialidade {i}', None] for i in range(5)],
+        'Médicos': [[f'Médico {i}', f'Especialidade {i % 5}', 'Cirurgião'] for i in range(23)]
+    }.items():
+        planilha = workbook.create_sheet(aba)
+        planilha.append([aba])
+        planilha.append(CAMPOS[aba])
+        for linha in linhas:
+            planilha.append(linha)
+    workbook.save(caminho)
+
+    with app.app_context():
+        # Mais lotes por aba do que cabem na fila (LOTES_EM_ESPERA): a leitura espera a gravação
+        resultado = ProcessadorExcel(tamanho_lote=2, paralelo=True).executar(caminho)
+        medicos = db.session.execute(select(MedicoModel.nome, MedicoModel.id_especialidade).order_by(MedicoModel.id)).all()
+
+    assert {aba: r['inseridos'] for aba, r in resultado.items()} == {'Especialidades': 5, 'Médicos': 23}
+    assert medicos[0] == ('médico 0', 1)
+    assert medicos[-1] == ('médico 22', 3)
+
+
+def test_modo_paralelo_repassa_erro_da_leitura(app, tmp_path):
+    caminho = tmp_path / 'planilha.xlsx'
+    workbook = openpyxl.Workbook()
+    workbook.active.title = 'Especialidades'
+    workbook.active.append(['Especialidades'])
+    workbook.active.append(CAMPOS['Especialidades'])
+    workbook.create_sheet('Planos').append(['Planos'])  # sem cabeçalho
+    workbook.save(caminho)
+
+    with app.app_context(), pytest.raises(ValueError, match='sem as colunas esperadas'):
+        ProcessadorExcel(paralelo=True).executar(caminho)
+
+
+def test_modo_paralelo_interrompido_encerra_as_leituras(app, tmp_path):
+    caminho = planilha(tmp_path, 'Especialidades', [[f'Especialidade {i}', None] for i in range(30)])
+    workbook = openpyxl.load_workbook(caminho)
+    workbook.create_sheet('Planos').append(['Planos'])
+    workbook['Planos'].append(CAMPOS['Planos'])
+    for i in range(30):
+        workbook['Planos'].append([f'Plano {i}', None])
+    workbook.save(caminho)
+
+    def interromper(aba, resumo, linhas):
+        raise RuntimeError('interrompida')
+
+    # Os processos parados com a fila cheia são encerrados junto com a importação
+    with app.app_context(), pytest.raises(RuntimeError, match='interrompida'):
+        ProcessadorExcel(tamanho_lote=1, paralelo=True).executar(caminho, progresso=interromper)
+
+
+def importar(app, caminho, **opcoes):
+    with app.app_context():
+        resumo = ProcessadorExcel(**opcoes).executar(caminho)['Planos']
+    return {k: resumo.get(k) for k in ('inseridos', 'atualizados', 'inalterados', 'desativados')}
+
+
+@pytest.fixture
+def planos(tmp_path):
+    return planilha(tmp_path, 'Planos', [['Plano A', 'PA'], ['Plano B', 'PB']])
+
+
+def test_incremental_regrava_linha_removida_pela_api(app, cliente, planos):
+    importar(app, planos, modo='incremental')
+    assert cliente.delete('/api/planos/1').status_code == 204
+
+    assert importar(app, planos, modo='incremental') == {'inseridos': 1, 'atualizados': 0, 'inalterados': 1, 'desativados': None}
+
+
+def test_incremental_regrava_linhas_alteradas_pela_api(app, cliente, planos):
+    importar(app, planos, modo='incremental')
+    assert cliente.patch('/api/planos/1', json={'nome': 'plano a', 'sigla': 'X'}).status_code == 200
+    assert cliente.patch('/api/planos/batch', json=[{'id': 2, 'nome': 'plano b', 'sigla': 'Y'}]).status_code == 200
+
+    assert importar(app, planos, modo='incremental') == {'inseridos': 0, 'atualizados': 2, 'inalterados': 0, 'desativados': None}
+
+
+def test_incremental_regrava_linha_alterada_por_upsert(app, planos, tmp_path):
+    importar(app, planos, modo='incremental')
+    (tmp_path / 'novo').mkdir()
+    importar(app, planilha(tmp_path / 'novo', 'Planos', [['Plano A', 'NEW']]), modo='upsert')
+
+    assert importar(app, planos, modo='incremental') == {'inseridos': 0, 'atualizados': 1, 'inalterados': 1, 'desativados': None}
+
+
+def test_desativar_ausentes_inclui_linha_alterada_pela_api(app, cliente, planos, tmp_path):
+    importar(app, planos, modo='incremental')
+    assert cliente.patch('/api/planos/2', json={'nome': 'plano b', 'sigla': 'X'}).status_code == 200
+
+    # A linha alterada pela API continua contando como importada
+    (tmp_path / 'novo').mkdir()
+    so_a = planilha(tmp_path / 'novo', 'Planos', [['Plano A', 'PA']])
+    assert importar(app, so_a, modo='incremental', desativar_ausentes=True)['desativados'] == 1
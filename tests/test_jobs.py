@@ -0,0 +1,113 @@
+"""
+Jobs de upload (jobs.py): o arquivo enviado é gravado em disco antes da resposta 202, e os
+jobs interrompidos são retomados na 1ª requisição de cada processo ou pelo comando
+`flask retomar-jobs`.
+"""
+import io
+import time
+
+import pytest
+from flask_restful import Api
+from sqlalchemy import select, func
+
+import jobs
+import resources
+from comum import criar_app, TEMPLATE
+from models import db, UploadJobModel, PlanoModel
+from resources import UploadDados, UploadStatus
+
+
+def criar_app_jobs(uri):
+    app = criar_app(uri)
+    jobs.instalar(app)
+    api = Api(app)
+    api.add_resource(UploadDados, '/api/upload')
+    api.add_resource(UploadStatus, '/api/upload/<string:job_id>')
+    return app
+
+
+@pytest.fixture
+def uri(tmp_path, monkeypatch):
+    # Banco em arquivo: os jobs rodam nas threads do executor, com conexões próprias
+    monkeypatch.setattr(jobs, 'DIRETORIO_UPLOADS', str(tmp_path / 'uploads'))
+    return f"sqlite:///{tmp_path / 'jobs.db'}"
+
+
+@pytest.fixture
+def app(uri):
+    return criar_app_jobs(uri)
+
+
+def enviar(cliente):
+    with open(TEMPLATE, 'rb') as planilha:
+        resposta = cliente.post('/api/upload', data={'file': (io.BytesIO(planilha.read()), 'planilha.xlsx')})
+    assert resposta.status_code == 202
+    return resposta.get_json()['job_id']
+
+
+def job(app, job_id):
+    with app.app_context():
+        return db.session.get(UploadJobModel, job_id)
+
+
+def aguardar(app, job_id, segundos=30):
+    limite = time.monotonic() + segundos
+    while job(app, job_id).status in ('pendente', 'processando'):
+        assert time.monotonic() < limite, 'O job não terminou.'
+        time.sleep(0.05)
+    return job(app, job_id)
+
+
+def planos(app):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(PlanoModel))
+
+
+@pytest.fixture
+def interrompido(app, monkeypatch):
+    """
+    Job recebido por um processo que parou antes de executá-lo: nada foi enfileirado e a
+    cópia em memória se perdeu com o processo.
+    """
+    monkeypatch.setattr(resources, 'enfileirar', lambda app, job_id: None)
+    job_id = enviar(app.test_client())
+
+    jobs._conteudos.clear()
+    return job_id
+
+
+def test_upload_pequeno_gravado_em_disco_antes_da_resposta(app, interrompido):
+    registro = job(app, interrompido)
+    assert registro.status == 'pendente'
+    with open(registro.arquivo, 'rb') as arquivo, open(TEMPLATE, 'rb') as original:
+        assert arquivo.read() == original.read()
+
+
+def test_primeira_requisicao_retoma_os_jobs_interrompidos(app, uri, interrompido):
+    # Outro processo (ou o mesmo, reiniciado) sobre o mesmo banco
+    reiniciado = criar_app_jobs(uri)
+    reiniciado.test_client().get('/api/planos')
+
+    registro = aguardar(app, interrompido)
+    assert registro.status == 'concluido', registro.erro
+    assert planos(app) == 7
+
+
+def test_comando_retoma_os_jobs_interrompidos(app, interrompido):
+    resultado = app.test_cli_runner().invoke(args=['retomar-jobs'])
+
+    # O comando só termina depois dos jobs
+    assert resultado.exit_code == 0, resultado.output
+    registro = job(app, interrompido)
+    assert registro.status == 'concluido', registro.erro
+    assert planos(app) == 7
+
+
+def test_job_reservado_por_um_so_processo(app, interrompido):
+    # Dois processos retomando ao mesmo tempo: o job roda uma única vez
+    futuros = jobs.retomar_pendentes(app) + jobs.retomar_pendentes(app)
+    for futuro in futuros:
+        futuro.result()
+
+    assert job(app, interrompido).status == 'concluido'
+    assert planos(app) == 7
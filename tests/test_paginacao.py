@@ -0,0 +1,33 @@
+"""
+Paginação por cursor (?limit/?cursor) das listagens.
+"""
+import pytest
+from sqlalchemy import insert
+
+from models import db, PlanoModel
+
+
+@pytest.fixture
+def povoado(app):
+    with app.app_context():
+        db.session.execute(insert(PlanoModel), [{'nome': f'plano {i}'} for i in range(5)])
+        db.session.commit()
+    return app
+
+
+@pytest.mark.parametrize('limite', ['0', '-1'])
+def test_limit_menor_que_um_retorna_400(povoado, cliente, limite):
+    resposta = cliente.get(f'/api/planos?limit={limite}')
+    assert resposta.status_code == 400
+
+
+def test_cursor_percorre_todas_as_linhas(povoado, cliente):
+    nomes = []
+    url = '/api/planos?limit=2'
+    while url:
+        dados = cliente.get(url).get_json()
+        assert dados['limite'] == 2
+        nomes += [item['nome'] for item in dados['itens']]
+        url = f"/api/planos?limit=2&cursor={dados['proximo_cursor']}" if dados['proximo_cursor'] else None
+
+    assert nomes == [f'plano {i}' for i in range(5)]
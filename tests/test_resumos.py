@@ -0,0 +1,88 @@
+"""
+Resumos de contagem (resumo_contagem) de /api/stats: preenchidos pela migração que cria a tabela
+e mantidos pelas escritas sempre iguais ao recalculado com GROUP BY.
+"""
+from flask_migrate import upgrade, downgrade
+from sqlalchemy import event, select, insert
+
+from models import db, ResumoContagemModel, EspecialidadeModel, MedicoModel, PlanoModel
+from resumos import recalcular, contabilizar
+
+COLUNAS = ('tabela', 'grupo', 'chave', 'registros', 'ativos', 'pacientes', 'pacientes_ativos')
+
+
+def resumos():
+    consulta = select(*[ResumoContagemModel.__table__.c[c] for c in COLUNAS])
+    return sorted(tuple(l) for l in db.session.execute(consulta))
+
+
+def recalculados():
+    recalcular()
+    linhas = resumos()
+    db.session.rollback()
+    return linhas
+
+
+def povoar():
+    db.session.execute(insert(EspecialidadeModel), [{'nome': 'cardiologia'}, {'nome': 'pediatria', 'ativo': False}])
+    db.session.execute(insert(MedicoModel), [
+        {'nome': 'ana', 'tipo': 'Clínico', 'id_especialidade': 1, 'pacientes': 10},
+        {'nome': 'bia', 'tipo': 'Clínico', 'id_especialidade': 1, 'pacientes': 5, 'ativo': False},
+        {'nome': 'caio', 'tipo': 'Clínico', 'id_especialidade': None, 'pacientes': None}
+    ])
+    db.session.execute(insert(PlanoModel), [{'nome': 'unimed', 'pacientes': 7, 'ativo': None}])
+    db.session.commit()
+
+
+def test_migracao_preenche_os_resumos_das_linhas_existentes(app):
+    with app.app_context():
+        # Banco com dados anteriores à tabela resumo_contagem
+        downgrade(revision='7ae67adaf6fd')
+        povoar()
+        upgrade()
+
+        assert resumos() == recalculados()
+        assert ('medico', 'id_especialidade', 1, 2, 1, 15, 10) in resumos()
+
+
+def test_escritas_mantem_os_resumos(app, cliente):
+    with app.app_context():
+        # Linhas gravadas direto no banco: os resumos partem do recalculado
+        povoar()
+        recalcular()
+        db.session.commit()
+
+    assert cliente.post('/api/medicos/batch', json=[
+        {'nome': 'davi', 'tipo': 'Clínico', 'id_especialidade': 2, 'pacientes': 3},
+        {'nome': 'eva', 'tipo': 'Clínico', 'id_especialidade': 2, 'pacientes': 4, 'ativo': False}
+    ]).status_code == 200
+    assert cliente.patch('/api/medicos/1', json={'nome': 'ana', 'tipo': 'Clínico', 'id_especialidade': 2, 'pacientes': 1}).status_code == 200
+    assert cliente.delete('/api/especialidades/1').status_code == 204
+
+    with app.app_context():
+        assert resumos() == recalculados()
+
+
+def test_contabilizar_soma_com_um_unico_upsert(app):
+    with app.app_context():
+        povoar()
+        recalcular()
+        db.session.commit()
+
+        instrucoes = []
+
+        def capturar(conn, cursor, instrucao, parametros, context, executemany):
+            instrucoes.append(instrucao)
+
+        # Chave existente (especialidade 1) e chave nova (especialidade 2) no mesmo lote: sem o
+        # SELECT antes do INSERT, duas escritas simultâneas não tentam criar a mesma chave
+        event.listen(db.engine, 'before_cursor_execute', capturar)
+        try:
+            contabilizar(MedicoModel, depois=[{'id_especialidade': 1, 'pacientes': 2}, {'id_especialidade': 2}])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capturar)
+
+        assert len(instrucoes) == 1
+        assert 'ON CONFLICT' in instrucoes[0] or 'ON DUPLICATE KEY' in instrucoes[0]
+        assert ('medico', 'id_especialidade', 1, 3, 2, 17, 12) in resumos()
+        assert ('medico', 'id_especialidade', 2, 1, 1, 0, 0) in resumos()
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from sqlalchemy import update, insert, select
+
+from models import db, VersaoTabelaModel
+from cache import cache_respostas
+
+# --- Versão das tabelas ---
+# Cada escrita numa tabela de tags (CRUD, lote ou importação) incrementa a versão da
+# tabela na mesma transação. Caches e ETags usam essas versões para saber se um dado
+# mudou sem precisar consultar as tabelas em si.
+
+
+def _nome(tabela):
+    return getattr(tabela, '__tablename__', tabela)
+
+
+def tabelas_dependentes(model):
+    """
+    Tabela do model mais as tabelas referenciadas por FK (ex.: medico -> especialidade),
+    já que as respostas do model também mostram dados delas.
+    """
+    tabela = model.__table__
+    return sorted({tabela.name} | {fk.column.table.name for fk in tabela.foreign_keys})
+
+
+def versoes(tabelas):
+    """
+    Retorna {tabela: (versao, atualizado_em)} em uma única consulta pela primary key.
+    """
+    tabelas = [_nome(t) for t in tabelas]
+    linhas = db.session.execute(
+        select(VersaoTabelaModel.tabela, VersaoTabelaModel.versao, VersaoTabelaModel.atualizado_em)
+        .where(VersaoTabelaModel.tabela.in_(tabelas))
+    )
+    resultado = {t: (0, None) for t in tabelas}
+    resultado.update({l.tabela: (l.versao, l.atualizado_em) for l in linhas})
+    return resultado
+
+
+def registrar_alteracao(*tabelas):
+    """
+    Incrementa a versão das tabelas na transação atual (o commit fica por conta de quem chamou)
+    e descarta as respostas em cache que dependem delas.
+    """
+    agora = datetime.utcnow()
+    nomes = sorted({_nome(t) for t in tabelas})
+
+    for nome in nomes:
+        resultado = db.session.execute(
+            update(VersaoTabelaModel)
+            .where(VersaoTabelaModel.tabela == nome)
+            .values(versao=VersaoTabelaModel.versao + 1, atualizado_em=agora)
+        )
+        if resultado.rowcount == 0:
+            db.session.execute(insert(VersaoTabelaModel).values(tabela=nome, versao=1, atualizado_em=agora))
+
+    cache_respostas.invalidar(nomes)
+
+
+def inicializar_versoes(*models):
+    """
+    Cria a linha de versão das tabelas que ainda não têm (chamado na inicialização, para que
+    escritas concorrentes depois só precisem do UPDATE).
+    """
+    existentes = set(db.session.scalars(select(VersaoTabelaModel.tabela)))
+    for model in models:
+        if model.__tablename__ not in existentes:
+            db.session.add(VersaoTabelaModel(tabela=model.__tablename__, versao=0))
+    db.session.commit()